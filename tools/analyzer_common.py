@@ -0,0 +1,144 @@
+"""Sketches and helpers shared by file_analyzer.py and sz_json_analyzer.py
+
+Both tools import this module from their own directory, so copy it along with them.
+"""
+import hashlib
+import math
+import os
+import time
+
+
+def value_hash(value):
+    """Stable 64-bit hash of a string value (the builtin hash() is salted per process)"""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "big")
+
+
+def parse_size(size):
+    """Convert a size like 512M or 2G (plain numbers are megabytes) to bytes"""
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    size = size.strip().upper().rstrip("B")
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(float(size) * units["M"])
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter over 64-bit hashes (about 1.6% error with p=12)"""
+
+    def __init__(self, p=12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        self.value_bits = 64 - p
+        self.value_mask = (1 << self.value_bits) - 1
+
+    def add(self, hashed):
+        index = hashed >> self.value_bits
+        rank = self.value_bits - (hashed & self.value_mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0**-r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)  # linear counting for small sets
+        return int(round(estimate))
+
+
+class BloomFilter:
+    """Bloom filter over 64-bit value hashes, sized for a capacity at a false positive rate"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.bit_count = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.bits = bytearray(self.bit_count // 8 + 1)
+        self.count = 0
+
+    def positions(self, hashed):
+        # double hashing: derive the k bit positions from the two halves of the 64-bit hash
+        h1 = hashed & 0xFFFFFFFF
+        h2 = (hashed >> 32) | 1
+        return [(h1 + i * h2) % self.bit_count for i in range(self.hash_count)]
+
+    def add(self, hashed):
+        for pos in self.positions(hashed):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, hashed):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self.positions(hashed))
+
+    def false_positive_rate(self):
+        """Expected false positive rate given how full the filter is"""
+        fill_ratio = sum(bin(byte).count("1") for byte in self.bits) / self.bit_count
+        return fill_ratio**self.hash_count
+
+
+class OffsetLineReader:
+    """Iterates the decoded lines of a file opened in binary mode while tracking the byte offset
+
+    offset is always the position just after the last line handed out, so it is the
+    start of the next record for readers that consume lines on demand (json, csv).
+    line holds the raw bytes of that last line.
+    """
+
+    def __init__(self, file, encoding):
+        self.file = file
+        self.encoding = encoding
+        self.offset = file.tell()
+        self.line = b""
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.file.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        self.line = line
+        return line.decode(self.encoding)
+
+    def close(self):
+        self.file.close()
+
+
+class ReportRefresher:
+    """Rewrites the report during a long run, every refresh_rows new rows or refresh_interval seconds
+
+    write_report(analyzer, file_name) writes the report; it goes to a temporary file with the
+    same extension first and is then swapped in, so the report is never seen half written.
+    """
+
+    def __init__(self, analyzer, output_file, write_report, refresh_rows=0, refresh_interval=0):
+        self.analyzer = analyzer
+        self.output_file = output_file
+        self.write_report = write_report
+        self.refresh_rows = refresh_rows
+        self.refresh_interval = refresh_interval
+        self.refresh_count = 0
+        self.refresh_time = time.time()
+
+    def check(self):
+        new_rows = self.analyzer.record_count - self.refresh_count
+        if not new_rows:
+            return
+        if (self.refresh_rows and new_rows >= self.refresh_rows) or (
+            self.refresh_interval and time.time() - self.refresh_time >= self.refresh_interval
+        ):
+            self.refresh()
+
+    def refresh(self):
+        root, ext = os.path.splitext(self.output_file)
+        temp_file_name = f"{root}.tmp{ext}"
+        self.write_report(self.analyzer, temp_file_name)
+        os.replace(temp_file_name, self.output_file)
+        self.refresh_count = self.analyzer.record_count
+        self.refresh_time = time.time()
+        print(f"report refreshed in {self.output_file} at {self.refresh_count:,} rows")
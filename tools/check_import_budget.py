@@ -0,0 +1,89 @@
+#! /usr/bin/env python3
+"""Check that the CLI tools start without their heavy optional modules
+
+Runs file_analyzer.py on a csv and a jsonl file, and the mapper template, under
+python -X importtime, then fails if numpy, pandas or prettytable were imported or
+the total import time is over the budget.
+
+    python3 tools/check_import_budget.py --budget_ms 150
+
+tools/test_import_budget.py runs the same check as a unittest.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+
+# only parquet input or a console report should pull these in
+HEAVY_MODULES = ("numpy", "pandas", "prettytable")
+
+DEFAULT_BUDGET_MS = 150
+
+
+def import_times(args):
+    """Run a python command under -X importtime, returning {top level module: self time in microseconds}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args, cwd=REPO_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, module = line[len("import time:"):].split("|")
+        module = module.strip().split(".")[0]
+        modules[module] = modules.get(module, 0) + int(self_us)
+    return modules
+
+
+def check_runs(budget_ms=DEFAULT_BUDGET_MS):
+    """Import times of each run as (run name, total ms, {module: self time in microseconds}, problem or None)"""
+    temp_dir = tempfile.mkdtemp()
+    output_file = os.path.join(temp_dir, "schema.csv")
+    runs = {
+        "file_analyzer csv": ["tools/file_analyzer.py", "employee_data/data/us-small-employee-raw.csv",
+                              "-o", output_file],
+        "file_analyzer jsonl": ["tools/file_analyzer.py", "employee_data/byhand/mapped_employees-byhand.jsonl",
+                                "-o", output_file],
+        "mapper template": ["tools/python_template.py", "--help"],
+    }
+    results = []
+    try:
+        for run_name, run_args in runs.items():
+            modules = import_times(run_args)
+            total_ms = sum(modules.values()) / 1000
+            heavy = [x for x in HEAVY_MODULES if x in modules]
+            problem = None
+            if heavy:
+                problem = f"imported {', '.join(heavy)}"
+            elif total_ms > budget_ms:
+                problem = f"over the {budget_ms:g}ms budget"
+            results.append((run_name, total_ms, modules, problem))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time budget of the CLI tools")
+    parser.add_argument("--budget_ms", "--budget-ms", dest="budget_ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"maximum total import time of each run in milliseconds, default {DEFAULT_BUDGET_MS}")
+    args = parser.parse_args()
+
+    failed = False
+    for run_name, total_ms, modules, problem in check_runs(args.budget_ms):
+        failed = failed or problem is not None
+        print(f"{run_name}: {total_ms:.1f}ms in {len(modules)} modules, {f'FAILED, {problem}' if problem else 'ok'}")
+        if problem:
+            for module, self_us in sorted(modules.items(), key=lambda x: x[1], reverse=True)[:10]:
+                print(f"    {module}: {self_us / 1000:.1f}ms")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
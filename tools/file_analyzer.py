@@ -1,29 +1,63 @@
 #! /usr/bin/env python3
 import argparse
+import atexit
 import configparser
 import csv
+import itertools
 import glob
+import gzip
+import heapq
 import json
+import math
 import os
 import pathlib
+import shutil
 import subprocess
 import sys
+import tempfile
 import time
 import xml.etree.ElementTree as ET  # Add import for XML parsing
+from array import array
 from datetime import date, datetime, timedelta
+from statistics import NormalDist
 from typing import Iterable, Iterator
 
-import numpy as np
+from analyzer_common import BloomFilter, HyperLogLog, OffsetLineReader, ReportRefresher, parse_size, value_hash
+
+# numpy, pandas and prettytable are slow to import, so they are loaded on first use
+np = None
+pd = None
+prettytable = None
+CONTAINER_TYPES = (dict, list)  # numpy arrays are added once pandas is loaded
+ARRAY_TYPES = ()
+
+
+def load_pandas():
+    """Import pandas and numpy (only parquet input needs them), returns False if not installed"""
+    global np, pd, CONTAINER_TYPES, ARRAY_TYPES
+    if pd is None:
+        try:
+            import numpy
+            import pandas
+        except ImportError:
+            pd = False
+        else:
+            np, pd = numpy, pandas
+            CONTAINER_TYPES = (dict, list, numpy.ndarray)
+            ARRAY_TYPES = (numpy.ndarray,)
+    return pd
 
-try:
-    import pandas as pd
-except:
-    pd = False
 
-try:
-    import prettytable
-except:
-    prettytable = False
+def load_prettytable():
+    """Import prettytable for console reports, returns False if not installed"""
+    global prettytable
+    if prettytable is None:
+        try:
+            import prettytable as module
+            prettytable = module
+        except ImportError:
+            prettytable = False
+    return prettytable
 
 
 class JsonReader(Iterable):
@@ -39,6 +73,66 @@ class JsonReader(Iterable):
         return json.loads(next(self._iterator))
 
 
+def compact_row(row):
+    """Drop the empty and whitespace only cells of a flat row so later work scales with populated cells"""
+    return {key: value for key, value in row.items() if value and not (isinstance(value, str) and value.isspace())}
+
+
+class FollowLineReader:
+    """Iterates the lines of a growing file, waiting at the end for more and reopening it after rotation
+
+    Partial lines are held back until their newline arrives. on_idle is called each time the
+    end of the file is reached, before waiting.
+    """
+
+    def __init__(self, file_name, encoding, poll_interval=1.0, on_idle=None):
+        self.file_name = file_name
+        self.encoding = encoding
+        self.poll_interval = poll_interval
+        self.on_idle = on_idle
+        self.file = open(file_name, "rb")
+        self.partial = b""
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            line = self.file.readline()
+            if line.endswith(b"\n"):
+                line = self.partial + line
+                self.partial = b""
+                if line.strip():
+                    return line.decode(self.encoding)
+                continue
+            if line:
+                self.partial += line
+                continue
+            if self.rotated():
+                self.file.close()
+                self.file = open(self.file_name, "rb")
+                print(f"{self.file_name} was rotated, reading the new file")
+                if self.partial.strip():
+                    line, self.partial = self.partial, b""
+                    return line.decode(self.encoding)
+                self.partial = b""
+                continue
+            if self.on_idle:
+                self.on_idle()
+            time.sleep(self.poll_interval)
+
+    def rotated(self):
+        """True if the name now points at a different file, or the file was truncated"""
+        try:
+            stat = os.stat(self.file_name)
+        except FileNotFoundError:
+            return False  # moved away and not recreated yet
+        return stat.st_ino != os.fstat(self.file.fileno()).st_ino or stat.st_size < self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
 class Node(object):
 
     def __init__(self, node_id):
@@ -77,6 +171,862 @@ class Node(object):
         return tree
 
 
+class MinHashSignature:
+    """Bottom-k MinHash: the k smallest distinct value hashes seen
+
+    The kept hashes are a uniform sample of the distinct values, so they estimate
+    both the distinct count and the overlap with another signature.
+    """
+
+    def __init__(self, k=128):
+        self.k = k
+        self.heap = []  # negated hashes so heap[0] is the largest kept hash
+        self.hashes = set()
+
+    def add(self, hashed):
+        if len(self.heap) < self.k:
+            if hashed not in self.hashes:
+                heapq.heappush(self.heap, -hashed)
+                self.hashes.add(hashed)
+        elif hashed < -self.heap[0] and hashed not in self.hashes:
+            self.hashes.discard(-heapq.heapreplace(self.heap, -hashed))
+            self.hashes.add(hashed)
+
+    def max_hash(self):
+        return -self.heap[0] if self.heap else 0
+
+    def distinct_estimate(self):
+        if len(self.heap) < self.k:
+            return len(self.heap)
+        return int((self.k - 1) * (1 << 64) / (self.max_hash() + 1))
+
+
+class JoinSignature:
+    """Per attribute sketch used to find join keys: a bottom-k MinHash plus a bloom filter"""
+
+    # above this the bloom filter is too full to tell shared values from false positives
+    max_bloom_fp_rate = 0.01
+    # about 64 Kbit with 3 hash functions, so every attribute costs the same 8 KB
+    bloom_capacity = 15000
+    bloom_error_rate = 0.125
+
+    def __init__(self):
+        self.minhash = MinHashSignature()
+        self.bloom = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+
+    def add(self, value):
+        hashed = value_hash(value)
+        self.minhash.add(hashed)
+        self.bloom.add(hashed)
+
+    def containment_in(self, other):
+        """Estimated fraction of this attribute's distinct values that also appear in other"""
+        sample = self.minhash.hashes
+        if not sample:
+            return 0.0
+        other_max = other.minhash.max_hash()
+        found = 0
+        bloom_checks = 0
+        for hashed in sample:
+            if hashed <= other_max:
+                # other's signature holds every one of its values below its max hash
+                found += hashed in other.minhash.hashes
+            else:
+                bloom_checks += 1
+                found += hashed in other.bloom
+        containment = found / len(sample)
+        if bloom_checks:
+            fp_rate = other.bloom.false_positive_rate()
+            if fp_rate > self.max_bloom_fp_rate:
+                # a high cardinality column saturates the filter, the minhash alone is a safer estimate
+                return self.minhash_containment_in(other)
+            # remove the expected bloom filter false positives
+            false_hits = bloom_checks * fp_rate
+            containment = max(0.0, (found - false_hits) / (len(sample) - false_hits))
+        return min(containment, 1.0)
+
+    def minhash_containment_in(self, other):
+        """Containment from the jaccard similarity and the estimated size of the union"""
+        distinct_cnt = self.minhash.distinct_estimate()
+        union = heapq.nsmallest(self.minhash.k, self.minhash.hashes | other.minhash.hashes)
+        if not distinct_cnt or not union:
+            return 0.0
+        union_cnt = len(union) if len(union) < self.minhash.k else (self.minhash.k - 1) * (1 << 64) / (union[-1] + 1)
+        return min(self.jaccard(other) * union_cnt / distinct_cnt, 1.0)
+
+    def jaccard(self, other):
+        """Estimated jaccard similarity from the k smallest hashes of the union"""
+        union = heapq.nsmallest(self.minhash.k, self.minhash.hashes | other.minhash.hashes)
+        if not union:
+            return 0.0
+        shared = sum(1 for hashed in union if hashed in self.minhash.hashes and hashed in other.minhash.hashes)
+        return shared / len(union)
+
+
+MASK64 = (1 << 64) - 1
+
+
+def combine_hashes(hashes):
+    """Fold several 64-bit value hashes into one fingerprint (order sensitive)"""
+    combined = 0
+    for hashed in hashes:
+        combined = (combined * 0x9E3779B97F4A7C15 + hashed + 1) & MASK64
+    # splitmix64 finalizer so combinations spread evenly over the hash space
+    combined = ((combined ^ (combined >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    combined = ((combined ^ (combined >> 27)) * 0x94D049BB133111EB) & MASK64
+    return combined ^ (combined >> 31)
+
+
+class SpilledHashSet:
+    """Append-only set of 64-bit hashes kept on disk, counted exactly by an external sort"""
+
+    def __init__(self, temp_dir=None, buffer_size=1 << 16, run_size=1 << 22):
+        self.file = tempfile.NamedTemporaryFile(prefix="fa_hashes_", dir=temp_dir, delete=False)
+        self.buffer = array("Q")
+        self.buffer_size = buffer_size
+        self.run_size = run_size
+
+    def add(self, hashed):
+        self.buffer.append(hashed)
+        if len(self.buffer) >= self.buffer_size:
+            self.buffer.tofile(self.file)
+            del self.buffer[:]
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+        if os.path.exists(self.file.name):
+            os.remove(self.file.name)
+
+    def _write_runs(self):
+        """Sort the spill file in memory sized chunks, returning the sorted run file names"""
+        self.buffer.tofile(self.file)
+        del self.buffer[:]
+        self.file.flush()
+        run_names = []
+        with open(self.file.name, "rb") as input_file:
+            while True:
+                chunk = array("Q")
+                try:
+                    chunk.fromfile(input_file, self.run_size)
+                except EOFError:
+                    pass  # partial final chunk
+                if not chunk:
+                    break
+                chunk = array("Q", sorted(chunk))
+                run_name = f"{self.file.name}.run{len(run_names)}"
+                with open(run_name, "wb") as run_file:
+                    chunk.tofile(run_file)
+                run_names.append(run_name)
+        return run_names
+
+    @staticmethod
+    def _read_run(run_name, chunk_size=1 << 16):
+        with open(run_name, "rb") as run_file:
+            while True:
+                chunk = array("Q")
+                try:
+                    chunk.fromfile(run_file, chunk_size)
+                except EOFError:
+                    pass
+                if not chunk:
+                    break
+                yield from chunk
+
+    def count(self):
+        """Return (distinct, duplicate) counts of everything added"""
+        run_names = self._write_runs()
+        distinct_cnt = duplicate_cnt = 0
+        prior = None
+        try:
+            for hashed in heapq.merge(*[self._read_run(run_name) for run_name in run_names]):
+                if hashed == prior:
+                    duplicate_cnt += 1
+                else:
+                    distinct_cnt += 1
+                    prior = hashed
+        finally:
+            for run_name in run_names:
+                os.remove(run_name)
+        return distinct_cnt, duplicate_cnt
+
+
+class UniqueValueSpill:
+    """Moves the unique value counts of the largest attributes to sorted run files once they pass a memory budget
+
+    Exact counts come back by merging an attribute's runs with what is still in memory, see summary(). Runs
+    keep the order each value was first seen in, so ties in the top values come out as they would in memory.
+    """
+
+    entry_bytes = 120  # rough cost of a dict entry, its str and int objects, beyond the value characters
+
+    def __init__(self, max_bytes, temp_dir=None):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.temp_dir = tempfile.mkdtemp(prefix="fa_values_", dir=temp_dir)
+        self.run_count = 0
+        self.spill_count = 0
+
+    def added(self, node, value):
+        """Account for a new unique value, returns True once the budget is exceeded"""
+        value_bytes = len(value) + self.entry_bytes
+        node.unique_bytes += value_bytes
+        self.used_bytes += value_bytes
+        return self.used_bytes > self.max_bytes
+
+    def spill(self, node_sets):
+        """Write out the heaviest attributes until memory use is back under half the budget"""
+        nodes = sorted((node for nodes in node_sets for node in nodes.values() if getattr(node, "unique_bytes", 0)),
+                       key=lambda x: x.unique_bytes, reverse=True)
+        for node in nodes:
+            if self.used_bytes <= self.max_bytes // 2:
+                break
+            self.write_run(node)
+        self.spill_count += 1
+
+    def write_run(self, node):
+        run_name = os.path.join(self.temp_dir, f"run{self.run_count}.jsonl")
+        self.run_count += 1
+        with open(run_name, "w", encoding="utf-8") as run_file:
+            for entry in sorted(self.memory_entries(node)):
+                run_file.write(json.dumps(entry) + "\n")
+        node.spill_runs.append(run_name)
+        node.spill_offset += len(node.unique_values)
+        node.unique_values = {}
+        self.used_bytes -= node.unique_bytes
+        node.unique_bytes = 0
+
+    @staticmethod
+    def _read_run(run_name):
+        with open(run_name, "r", encoding="utf-8") as run_file:
+            for line in run_file:
+                yield tuple(json.loads(line))
+
+    @staticmethod
+    def memory_entries(node):
+        """(value, count, first seen) for the values still in memory"""
+        return ((value, count, node.spill_offset + i) for i, (value, count) in enumerate(node.unique_values.items()))
+
+    def merged_counts(self, node):
+        """Yield (value, count, first seen) for every unique value of a spilled attribute, in value order"""
+        runs = [self._read_run(run_name) for run_name in node.spill_runs] + [iter(sorted(self.memory_entries(node)))]
+        prior = None
+        for value, count, first_seen in heapq.merge(*runs):
+            if prior and value == prior[0]:
+                prior[1] += count
+                prior[2] = min(prior[2], first_seen)
+                continue
+            if prior:
+                yield tuple(prior)
+            prior = [value, count, first_seen]
+        if prior:
+            yield tuple(prior)
+
+    def summary(self, node, top_count):
+        """Return (unique count, top (value, count) pairs) of a spilled attribute, cached until it changes"""
+        if node.spill_summary and node.spill_summary[0] == (node.record_count, top_count):
+            return node.spill_summary[1:]
+        unique_cnt = 0
+
+        def counted(value_counts):
+            nonlocal unique_cnt
+            for value_count in value_counts:
+                unique_cnt += 1
+                yield value_count
+
+        top_entries = heapq.nlargest(top_count, counted(self.merged_counts(node)), key=lambda v: (v[1], -v[2]))
+        top_values = [(value, count) for value, count, first_seen in top_entries]
+        node.spill_summary = ((node.record_count, top_count), unique_cnt, top_values)
+        return unique_cnt, top_values
+
+    def close(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+class KeyCandidate:
+    """Uniqueness tracking for one attribute or attribute combination"""
+
+    def __init__(self, attrs):
+        self.attrs = attrs
+        self.hll = HyperLogLog()
+        self.record_cnt = 0
+        self.populated_cnt = 0
+        self.exact_set = None  # SpilledHashSet when exact confirmation is requested
+        self.exact_counts = None
+        self.dropped = False
+
+
+class KeyDiscovery:
+    """Estimates which single attributes or small attribute combinations could be a record key
+
+    Single attributes are all tracked with HyperLogLog counters. Combinations are
+    chosen from the first sample_rows records: only combinations that are unique
+    (or nearly so) in that sample and have no unique subset are tracked, so the
+    number of sketches stays small however wide the file is.
+    """
+
+    def __init__(self, max_attrs=3, confirm=False, temp_dir=None):
+        self.max_attrs = max_attrs
+        self.confirm = confirm
+        self.temp_dir = temp_dir
+        self.sample_rows = 2000
+        self.combo_attr_limit = 15
+        self.max_combos = 20
+        self.max_confirm = 10
+        self.min_unique_pct = 99.0
+        self.prune_interval = 10000
+        self.record_count = 0
+        self.singles = {}  # attr -> KeyCandidate
+        self.combos = None  # chosen once the sample is complete
+        self.sample = []
+
+    def process(self, obj):
+        if not isinstance(obj, dict):
+            return
+        self.record_count += 1
+        hashes = {}
+        for attr, value in obj.items():
+            if attr and value is not None and value != "" and not isinstance(value, (dict, list)):
+                hashes[attr] = value_hash(str(value))
+
+        for attr, hashed in hashes.items():
+            if attr not in self.singles:
+                self.singles[attr] = KeyCandidate((attr,))
+            candidate = self.singles[attr]
+            candidate.populated_cnt += 1
+            candidate.hll.add(hashed)
+            if candidate.exact_set:
+                candidate.exact_set.add(hashed)
+
+        if self.combos is None:
+            self.sample.append(hashes)
+            if len(self.sample) >= self.sample_rows:
+                self.choose_combos()
+        else:
+            self.update_combos(hashes)
+            if self.record_count % self.prune_interval == 0:
+                self.prune()
+
+    def update_combos(self, hashes):
+        for candidate in self.combos:
+            if candidate.dropped:
+                continue
+            candidate.record_cnt += 1
+            values = [hashes.get(attr, 0) for attr in candidate.attrs]
+            if any(values):
+                candidate.populated_cnt += 1
+            combined = combine_hashes(values)
+            candidate.hll.add(combined)
+            if candidate.exact_set:
+                candidate.exact_set.add(combined)
+
+    def choose_combos(self):
+        """Pick the combinations worth tracking from the sample, then replay the sample into them"""
+        sample_cnt = len(self.sample)
+        sample_unique = {}
+        for attr in self.singles:
+            sample_unique[(attr,)] = len({row[attr] for row in self.sample if attr in row})
+
+        # attributes unique on their own are keys already, the rest are combined by cardinality
+        unique_attrs = {attr for attr in self.singles if sample_unique[(attr,)] == sample_cnt}
+        combo_attrs = sorted((attr for attr in self.singles if attr not in unique_attrs),
+                             key=lambda attr: sample_unique[(attr,)], reverse=True)[:self.combo_attr_limit]
+
+        unique_combos = []
+        near_unique_combos = []
+        for attr_count in range(2, self.max_attrs + 1):
+            for attrs in itertools.combinations(combo_attrs, attr_count):
+                if any(set(unique).issubset(attrs) for unique in unique_combos):
+                    continue  # not minimal
+                distinct_cnt = len({combine_hashes([row.get(attr, 0) for attr in attrs]) for row in self.sample})
+                if distinct_cnt == sample_cnt:
+                    unique_combos.append(attrs)
+                elif distinct_cnt * 100 / sample_cnt >= self.min_unique_pct:
+                    near_unique_combos.append((distinct_cnt, attrs))
+        near_unique_combos.sort(reverse=True)
+        chosen = (unique_combos + [attrs for _, attrs in near_unique_combos])[:self.max_combos]
+
+        self.combos = [KeyCandidate(attrs) for attrs in chosen]
+        if self.confirm:
+            confirm_list = [self.singles[attr] for attr in unique_attrs] + self.combos
+            for candidate in confirm_list[:self.max_confirm]:
+                candidate.exact_set = SpilledHashSet(self.temp_dir)
+            for row in self.sample:
+                for attr, hashed in row.items():
+                    if self.singles[attr].exact_set:
+                        self.singles[attr].exact_set.add(hashed)
+        for row in self.sample:
+            self.update_combos(row)
+        self.sample = []
+
+    def is_duplicated(self, candidate, record_cnt):
+        """True once the estimate is too far below the record count to be explained by sketch error"""
+        return candidate.hll.estimate() * 100 < record_cnt * (self.min_unique_pct - 2)
+
+    def prune(self):
+        """Stop tracking candidates the estimates already show to have duplicates"""
+        for candidate in self.singles.values():
+            if candidate.exact_set and self.is_duplicated(candidate, candidate.populated_cnt):
+                candidate.exact_set.close()
+                candidate.exact_set = None
+                candidate.dropped = True
+        for candidate in self.combos:
+            if not candidate.dropped and self.is_duplicated(candidate, candidate.record_cnt):
+                if candidate.exact_set:
+                    candidate.exact_set.close()
+                    candidate.exact_set = None
+                candidate.dropped = True
+
+    def finish(self):
+        if self.combos is None:
+            self.choose_combos()
+        for candidate in list(self.singles.values()) + self.combos:
+            if candidate.exact_set:
+                candidate.exact_counts = candidate.exact_set.count()
+                candidate.exact_set.close()
+                candidate.exact_set = None
+
+    def close(self):
+        for candidate in list(self.singles.values()) + (self.combos or []):
+            if candidate.exact_set:
+                candidate.exact_set.close()
+
+
+class KllSketch:
+    """Mergeable KLL quantile sketch: a stack of compactors whose sizes shrink geometrically
+
+    Memory stays at a few hundred values however many are added. Compaction keeps
+    alternating halves rather than random ones so reports are reproducible.
+    """
+
+    def __init__(self, k=200):
+        self.k = k
+        self.compactors = [[]]
+        self.offsets = [0]
+        self.count = 0
+        self.size = 0
+        self.max_size = self.capacity(0)
+
+    def capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def add(self, value):
+        self.compactors[0].append(value)
+        self.count += 1
+        self.size += 1
+        if self.size >= self.max_size:
+            self.compress()
+
+    def compress(self):
+        for level in range(len(self.compactors)):
+            compactor = self.compactors[level]
+            if len(compactor) >= self.capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                    self.offsets.append(0)
+                compactor.sort()
+                keep = compactor.pop() if len(compactor) % 2 else None
+                self.compactors[level + 1].extend(compactor[self.offsets[level]::2])
+                self.offsets[level] ^= 1
+                compactor.clear()
+                if keep is not None:
+                    compactor.append(keep)
+                break
+        self.size = sum(len(compactor) for compactor in self.compactors)
+        self.max_size = sum(self.capacity(level) for level in range(len(self.compactors)))
+        if self.size >= self.max_size:
+            self.compress()
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+            self.offsets.append(0)
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self.count += other.count
+        self.size = sum(len(compactor) for compactor in self.compactors)
+        self.max_size = sum(self.capacity(level) for level in range(len(self.compactors)))
+        if self.size >= self.max_size:
+            self.compress()
+
+    def to_state(self):
+        return {"k": self.k, "compactors": self.compactors, "offsets": self.offsets, "count": self.count}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state["k"])
+        sketch.compactors = state["compactors"]
+        sketch.offsets = state["offsets"]
+        sketch.count = state["count"]
+        sketch.size = sum(len(compactor) for compactor in sketch.compactors)
+        sketch.max_size = sum(sketch.capacity(level) for level in range(len(sketch.compactors)))
+        return sketch
+
+    def quantiles(self, fractions):
+        weighted = sorted((value, 1 << level) for level, compactor in enumerate(self.compactors) for value in compactor)
+        total = sum(weight for _, weight in weighted)
+        results = []
+        for fraction in fractions:
+            target = fraction * total
+            cumulative = 0
+            result = weighted[-1][0] if weighted else None
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    result = value
+                    break
+            results.append(result)
+        return results
+
+
+class NumericProfile:
+    """Detects whether an attribute holds numbers or dates and keeps its range and quantiles"""
+
+    date_formats = ["%m/%d/%y", "%m/%d/%Y", "%m-%d-%Y", "%d-%b-%Y", "%d-%b-%y", "%Y/%m/%d"]
+    max_failures = 10
+    max_failure_pct = 5
+    current_year = date.today().year
+
+    def __init__(self):
+        self.kind = None  # "int", "float" or "date" once detected, False if neither
+        self.date_format = None
+        self.min_value = None
+        self.max_value = None
+        self.sketch = None
+        self.attempts = 0
+        self.failures = 0
+
+    def parse(self, value):
+        """Return the value as a number (dates as day ordinals), or None if it does not parse"""
+        if self.kind == "date":
+            try:
+                if not self.date_format:
+                    return datetime.fromisoformat(value).toordinal()
+                parsed = datetime.strptime(value, self.date_format)
+                if "%y" in self.date_format and parsed.year > self.current_year:
+                    parsed = parsed.replace(year=parsed.year - 100)  # two digit years are in the past
+                return parsed.toordinal()
+            except (ValueError, TypeError):
+                return None
+        try:
+            number = float(value)
+        except (ValueError, TypeError):
+            return None
+        return number if math.isfinite(number) else None
+
+    def detect(self, value):
+        """Decide the kind from the first value that parses"""
+        if isinstance(value, (int, float)):
+            self.kind = "int" if isinstance(value, int) else "float"
+            return
+        value = value.strip()
+        try:
+            number = float(value)
+            if math.isfinite(number):
+                self.kind = "int" if value.lstrip("+-").isdigit() else "float"
+                return
+        except ValueError:
+            pass
+        try:
+            datetime.fromisoformat(value)
+            self.kind = "date"
+            return
+        except ValueError:
+            pass
+        for date_format in self.date_formats:
+            try:
+                datetime.strptime(value, date_format)
+                self.kind = "date"
+                self.date_format = date_format
+                return
+            except ValueError:
+                pass
+
+    def add(self, value):
+        if self.kind is False:
+            return
+        if isinstance(value, bool):
+            self.kind = False
+            return
+        self.attempts += 1
+        if self.kind is None:
+            self.detect(value)
+            if self.kind:
+                self.sketch = KllSketch()
+        number = self.parse(value) if self.kind else None
+        if number is None:
+            self.failures += 1
+            if self.failures > self.max_failures and self.failures * 100 > self.attempts * self.max_failure_pct:
+                self.kind = False  # not a numeric or date attribute after all
+                self.sketch = None
+            return
+        if self.kind == "int" and not number.is_integer():
+            self.kind = "float"
+        if self.min_value is None or number < self.min_value:
+            self.min_value = number
+        if self.max_value is None or number > self.max_value:
+            self.max_value = number
+        self.sketch.add(number)
+
+    def to_state(self):
+        state = {k: getattr(self, k) for k in ("kind", "date_format", "min_value", "max_value", "attempts", "failures")}
+        state["sketch"] = self.sketch.to_state() if self.sketch else None
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        profile = cls()
+        for k, v in state.items():
+            setattr(profile, k, v)
+        profile.sketch = KllSketch.from_state(state["sketch"]) if state["sketch"] else None
+        return profile
+
+    def merge(self, other):
+        """Combine the profile of another partition, a kind conflict means neither numbers nor dates"""
+        kinds = {self.kind, other.kind} - {None}
+        if False in kinds or ("date" in kinds and len(kinds) > 1):
+            self.kind = False
+            self.sketch = None
+        elif kinds:
+            self.kind = "float" if "float" in kinds else kinds.pop()
+            self.date_format = self.date_format or other.date_format
+            for number in (other.min_value, other.max_value):
+                if number is not None and (self.min_value is None or number < self.min_value):
+                    self.min_value = number
+                if number is not None and (self.max_value is None or number > self.max_value):
+                    self.max_value = number
+            if not self.sketch:
+                self.sketch = KllSketch()
+            if other.sketch:
+                self.sketch.merge(other.sketch)
+        self.attempts += other.attempts
+        self.failures += other.failures
+        if self.failures > self.max_failures and self.failures * 100 > self.attempts * self.max_failure_pct:
+            self.kind = False
+            self.sketch = None
+
+    def format_value(self, number):
+        if self.kind == "date":
+            return date.fromordinal(int(number)).isoformat()
+        if self.kind == "int":
+            return int(number)
+        return round(number, 4)
+
+    def summary(self):
+        """Return [min, p1, p50, p99, max] or blanks when the attribute is not numeric"""
+        if not self.kind or not self.sketch or not self.sketch.count:
+            return [""] * 5
+        p1, p50, p99 = self.sketch.quantiles([0.01, 0.5, 0.99])
+        return [self.format_value(x) for x in (self.min_value, p1, p50, p99, self.max_value)]
+
+
+# maps each character to its class for value masks, e.g. 123-45-6789 -> 999-99-9999
+PATTERN_TABLE = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789",
+    "A" * 26 + "a" * 26 + "9" * 10,
+)
+
+
+class PatternProfile:
+    """Bounded table of the most frequent value patterns (space-saving top-k counts)"""
+
+    max_patterns = 50
+    max_examples = 3
+    max_length = 30
+
+    def __init__(self):
+        self.patterns = {}  # pattern -> [count, overcount, examples]
+        self.total = 0
+
+    def add(self, value):
+        pattern = value[:self.max_length].translate(PATTERN_TABLE)
+        if len(value) > self.max_length:
+            pattern += "+"
+        self.total += 1
+        stats = self.patterns.get(pattern)
+        if stats:
+            stats[0] += 1
+            if len(stats[2]) < self.max_examples and value not in stats[2]:
+                stats[2].append(value)
+        elif len(self.patterns) < self.max_patterns:
+            self.patterns[pattern] = [1, 0, [value]]
+        else:
+            # replace the least frequent pattern, inheriting its count as possible overcount
+            min_pattern = min(self.patterns, key=lambda x: self.patterns[x][0])
+            min_count = self.patterns.pop(min_pattern)[0]
+            self.patterns[pattern] = [min_count + 1, min_count, [value]]
+
+    def to_state(self):
+        return {"patterns": self.patterns, "total": self.total}
+
+    @classmethod
+    def from_state(cls, state):
+        profile = cls()
+        profile.patterns = state["patterns"]
+        profile.total = state["total"]
+        return profile
+
+    def merge(self, other):
+        """Add the counts of another table, then keep the max_patterns most frequent"""
+        for pattern, (count, overcount, examples) in other.patterns.items():
+            stats = self.patterns.get(pattern)
+            if stats:
+                stats[0] += count
+                stats[1] += overcount
+                stats[2].extend(x for x in examples if x not in stats[2])
+                del stats[2][self.max_examples:]
+            else:
+                self.patterns[pattern] = [count, overcount, list(examples)]
+        self.total += other.total
+        if len(self.patterns) > self.max_patterns:
+            keep = heapq.nlargest(self.max_patterns, self.patterns.items(), key=lambda x: x[1][0])
+            self.patterns = dict(keep)
+
+    def top(self, count):
+        """Return the most frequent (pattern, count) pairs"""
+        return heapq.nlargest(count, ((k, v[0]) for k, v in self.patterns.items()), key=lambda v: v[1])
+
+
+class DriftMonitor:
+    """Compares the attributes seen so far against a saved schema report (as written by -o file.csv)
+
+    Population rates are compared with a z-test at each check, so drift is only confirmed once it is both
+    larger than the tolerance and statistically significant. No drift is declared once every baseline
+    attribute's confidence interval lies within the tolerance of its baseline rate.
+    """
+
+    key_unique_pct = 99  # baseline uniqueness at or above this is treated as a record key
+    max_codes = 20  # baseline attributes with this many unique values or fewer are treated as code lists
+
+    def __init__(self, baseline_file, tolerance=5, alpha=0.001, min_rows=1000):
+        self.baseline_file = baseline_file
+        self.tolerance = tolerance / 100
+        self.alpha = alpha
+        self.z_critical = NormalDist().inv_cdf(1 - alpha / 2)
+        self.min_rows = min_rows
+        self.attributes = {}  # attribute -> {type, record_cnt, rate, unique_cnt, unique_pct}
+        self.record_count = 0
+        self.findings = {}  # (attribute, check) -> [attribute, check, baseline, observed, detail]
+        self.status = None  # "drift" or "no drift" once decided
+        self.load()
+
+    def load(self):
+        """Read the attribute rows of a schema report, skipping its file_name and file_type lines"""
+        header = None
+        with open(self.baseline_file, "r", encoding="utf-8") as file:
+            for row in csv.reader(file):
+                if not header:
+                    if row and row[0] == "attribute":
+                        header = row
+                    continue
+                if not row:
+                    continue
+                values = dict(zip(header, row))
+                self.attributes[values["attribute"]] = {
+                    "type": values["type"],
+                    "record_cnt": int(values["record_cnt"]),
+                    "record_pct": float(values["record_pct"]),
+                    "unique_cnt": int(values["unique_cnt"]) if values.get("unique_cnt") else None,
+                    "unique_pct": float(values["unique_pct"]) if values.get("unique_pct") else None,
+                }
+        if not header:
+            raise ValueError(f"{self.baseline_file} is not an ungrouped schema report (no attribute header row)")
+
+        # the report does not store its record count, but every record_pct was computed from it
+        counted = [x for x in self.attributes.values() if x["record_pct"] > 0]
+        if counted:
+            largest = max(counted, key=lambda x: x["record_cnt"])
+            self.record_count = round(largest["record_cnt"] * 100 / largest["record_pct"])
+        for stats in self.attributes.values():
+            stats["rate"] = stats["record_cnt"] / self.record_count if self.record_count else 0
+
+    def standard_error(self, rate, record_count):
+        """Standard error of a population rate; rates over 1 (repeated list items) are treated as Poisson"""
+        variance = rate * (1 - rate) if rate <= 1 else rate
+        return math.sqrt(max(variance, 1 / record_count) / record_count)
+
+    def add_finding(self, attribute, check, baseline, observed, detail):
+        self.findings[(attribute, check)] = [attribute, check, baseline, observed, detail]
+
+    def check(self, analyzer):
+        """Compare the analyzer's counts so far to the baseline, returns "drift", "no drift" or None"""
+        record_count = analyzer.record_count
+        if not record_count:
+            return None
+        nodes = {node.node_desc: node for key, node in analyzer.nodes.items() if key != "root"}
+        settled = record_count >= self.min_rows
+
+        for attribute, node in nodes.items():
+            if attribute not in self.attributes:
+                if node.record_count:
+                    self.add_finding(attribute, "new attribute", "", f"{node.record_count} records", "")
+                continue
+            baseline = self.attributes[attribute]
+            if "unk" not in (node.node_type, baseline["type"]) and node.node_type != baseline["type"]:
+                self.add_finding(attribute, "type change", baseline["type"], node.node_type, "")
+
+        for attribute, baseline in self.attributes.items():
+            node = nodes.get(attribute)
+            observed_cnt = node.record_count if node else 0
+            rate = observed_cnt / record_count
+
+            if baseline["record_cnt"] and not observed_cnt:
+                # an attribute on every baseline record is missing as soon as a record lacks it, otherwise
+                # go by the chance of seeing no values at all in this many records if the rate had not changed
+                if baseline["rate"] >= 1 or record_count * math.log1p(-baseline["rate"]) < math.log(self.alpha):
+                    self.add_finding(attribute, "missing attribute", f"{baseline['record_pct']}%", "0%",
+                                     f"not seen in {record_count:,} records")
+                else:
+                    settled = False
+                continue
+
+            difference = rate - baseline["rate"]
+            z_score = difference / self.standard_error(baseline["rate"], record_count)
+            if abs(difference) > self.tolerance and abs(z_score) > self.z_critical:
+                self.add_finding(attribute, "population", f"{baseline['record_pct']}%",
+                                 f"{round(rate * 100, 2)}%", f"z={z_score:.1f}")
+            elif abs(difference) + self.z_critical * self.standard_error(rate, record_count) > self.tolerance:
+                settled = False
+
+            if node and not analyzer.pattern_only and not node.spill_runs and baseline["unique_cnt"] is not None:
+                self.check_uniqueness(attribute, baseline, node)
+
+        if self.findings:
+            self.status = "drift"
+        elif settled:
+            self.status = "no drift"
+        return self.status
+
+    def check_uniqueness(self, attribute, baseline, node):
+        """Uniqueness only means something for record keys and code lists, it grows with sample size otherwise"""
+        unique_cnt = len(node.unique_values)
+        if baseline["unique_pct"] >= self.key_unique_pct and node.record_count >= 100:
+            unique_pct = unique_cnt / node.record_count * 100
+            if unique_pct < baseline["unique_pct"] - self.tolerance * 100:
+                self.add_finding(attribute, "uniqueness", f"{baseline['unique_pct']}%", f"{round(unique_pct, 2)}%",
+                                 "duplicate values in a record key")
+        elif baseline["unique_cnt"] <= self.max_codes and baseline["record_cnt"] >= baseline["unique_cnt"] * 5:
+            allowed = baseline["unique_cnt"] + math.ceil(baseline["unique_cnt"] * self.tolerance)
+            if unique_cnt > allowed:
+                self.add_finding(attribute, "new codes", f"{baseline['unique_cnt']} values", f"{unique_cnt} values",
+                                 "")
+
+    def generate_report(self):
+        header = ["attribute", "check", "baseline", "observed", "detail"]
+        return [header] + sorted(self.findings.values(), key=lambda x: (x[1], x[0]))
+
+
+def offset_record_id(record_id, offset):
+    """Renumber a generated record_N id (records without an id) of a later partition"""
+    if offset and isinstance(record_id, str) and record_id.startswith("record_") and record_id[7:].isdigit():
+        return f"record_{int(record_id[7:]) + offset}"
+    return record_id
+
+
+SNAPSHOT_VERSION = 1
+
+
 class FileAnalyzer:
 
     def __init__(self, file_name, file_type, group_by_attr=None, enumerate_config=None):
@@ -90,6 +1040,22 @@ class FileAnalyzer:
         self.top_value_count = 10
         self.group_by_attr = group_by_attr
         self.group_by_filter = None  # Can be set after initialization
+        self.current_file = file_name  # Updated per input file when several are analyzed
+        self.join_signatures = None  # Set to {} to collect join key signatures
+        self.join_threshold = 0.5
+        self.join_min_distinct = 10
+        self.join_min_shared = 3
+        self.key_discovery = None  # Set to a KeyDiscovery to look for record keys
+        self.key_min_unique_pct = 90
+        self.numeric_profiles = True  # Detect numeric and date attributes for range and quantile columns
+        self.pattern_profiles = False  # Keep a table of value patterns per attribute
+        self.pattern_only = False  # Keep only the patterns, not every unique value
+        self.drill_down = 0  # Record pointers to keep per top value and code, 0 to disable
+        self.max_pointer_values = 10000  # Values per attribute to keep pointers for, the most frequent win
+        self.drill_files = []  # Files pointers refer to: {name, type, encoding, delimiter}
+        self.current_pointer = None  # (file index, byte offset) of the record being processed
+        self.flat_attributes = []  # Column names of flat files, registered up front for compacted rows
+        self.value_spill = None  # Set to a UniqueValueSpill to keep unique values within a memory budget
         
         # Handle both old and new enumeration formats
         if enumerate_config:
@@ -147,6 +1113,9 @@ class FileAnalyzer:
             group_value = obj.get(self.group_by_attr, "unknown")
             if str(group_value) != str(self.group_by_filter):
                 return  # Skip this record
+
+        if self.key_discovery:
+            self.key_discovery.process(obj)
         
         # Handle enumeration if enabled
         if (self.enumerate_attrs or self.is_pivot_enumeration) and isinstance(obj, dict):
@@ -169,14 +1138,7 @@ class FileAnalyzer:
             
             # Initialize group if not exists
             if group_value not in self.groups:
-                self.groups[group_value] = {
-                    "nodes": {"root": Node("root")},
-                    "record_count": 0
-                }
-                # Initialize root node for this group
-                root_node = self.groups[group_value]["nodes"]["root"]
-                root_node.node_desc = f"root ({group_value})"
-                root_node.node_type = self.root_node.node_type
+                self.create_group(group_value)
             
             # Process this record for the group
             self.groups[group_value]["record_count"] += 1
@@ -208,6 +1170,8 @@ class FileAnalyzer:
                         # Track which records contain this code (using record ID if available)
                         record_id = obj.get('id', f'record_{self.record_count}')
                         self.enumeration_stats[group_value][attr_path][value_str]['records'].add(record_id)
+                        if self.drill_down and self.current_pointer:
+                            self.add_pointer(self.enumeration_stats[group_value][attr_path][value_str], 'pointers')
 
     def process_enumeration(self, obj):
         """Process enumeration attributes for a single record"""
@@ -226,6 +1190,8 @@ class FileAnalyzer:
                         # Track which records contain this code (using record ID if available)
                         record_id = obj.get('id', f'record_{self.record_count}')
                         self.enumeration_stats[attr_path][value_str]['records'].add(record_id)
+                        if self.drill_down and self.current_pointer:
+                            self.add_pointer(self.enumeration_stats[attr_path][value_str], 'pointers')
 
     def process_pivot_enumeration(self, obj):
         """Process pivot enumeration for a single record"""
@@ -326,6 +1292,8 @@ class FileAnalyzer:
             group_pivot_stats[grouping_key][value_str]['count'] += 1
             record_id = obj.get('id', f'record_{self.record_count}')
             group_pivot_stats[grouping_key][value_str]['records'].add(record_id)
+            if self.drill_down and self.current_pointer:
+                self.add_pointer(group_pivot_stats[grouping_key][value_str], 'pointers')
 
     def extract_nested_values(self, obj, attr_path):
         """Extract values from nested attribute path like 'properties.type.type'"""
@@ -375,12 +1343,12 @@ class FileAnalyzer:
             for key, value in obj.items():
                 if key and key != self.group_by_attr:  # Skip the grouping attribute itself
                     self.update_node_for_group(group_value, prior_key, key, value)
-                    if isinstance(value, (dict, list, np.ndarray)):
+                    if isinstance(value, CONTAINER_TYPES):
                         self.iterate_obj_for_group(group_value, f"{prior_key}.{key}", value)
 
         elif isinstance(obj, list):
             for item in obj:
-                if isinstance(item, (dict, list, np.ndarray)):
+                if isinstance(item, CONTAINER_TYPES):
                     self.iterate_obj_for_group(group_value, prior_key, item)
                 else:
                     self.update_node_for_group(group_value, prior_key, prior_key.split(".")[-1], item)
@@ -390,12 +1358,12 @@ class FileAnalyzer:
             for key, value in obj.items():
                 if key:  # bad csvs have blank field names!
                     self.update_node(prior_key, key, value)
-                    if isinstance(value, (dict, list, np.ndarray)):
+                    if isinstance(value, CONTAINER_TYPES):
                         self.iterate_obj(f"{prior_key}.{key}", value)
 
         elif isinstance(obj, list):
             for item in obj:
-                if isinstance(item, (dict, list, np.ndarray)):
+                if isinstance(item, CONTAINER_TYPES):
                     self.iterate_obj(prior_key, item)
                 else:
                     self.update_node(prior_key, prior_key.split(".")[-1], item)
@@ -404,19 +1372,15 @@ class FileAnalyzer:
         """Update node for a specific group"""
         attr_key = f"{prior_key}.{key}" if key else prior_key
         group_nodes = self.groups[group_value]["nodes"]
-        
-        if attr_key not in group_nodes:
-            group_nodes[attr_key] = Node(attr_key)
-            group_nodes[attr_key].node_desc = attr_key.replace("root.", "")
-            group_nodes[attr_key].node_type = "unk"
-            group_nodes[attr_key].record_count = 0
-            group_nodes[attr_key].unique_values = {}
-            group_nodes[prior_key].add_child(group_nodes[attr_key])
+        node = group_nodes.get(attr_key) or self.create_node(group_nodes, prior_key, attr_key)
 
         if value is not None:
             # Handle numpy arrays and other array-like objects
             try:
-                if hasattr(value, '__len__') and not isinstance(value, str):
+                if isinstance(value, str):
+                    # Most values, compacted csv cells are never empty
+                    is_empty = not value
+                elif hasattr(value, '__len__'):
                     # Check if it's empty for arrays/lists
                     is_empty = len(value) == 0
                 else:
@@ -427,38 +1391,46 @@ class FileAnalyzer:
                 is_empty = False
 
             if not is_empty:
-                if group_nodes[attr_key].node_type == "unk":
-                    group_nodes[attr_key].node_type = str(type(value))[8:-2]
+                if node.node_type == "unk":
+                    node.node_type = str(type(value))[8:-2]
 
                 if isinstance(value, (dict, list)):
                     value = f"{len(value)} items"
-                elif isinstance(value, np.ndarray):
+                elif isinstance(value, ARRAY_TYPES):
                     value = f"array({value.shape}) items"
-
-                # Ensure value is always a string for dictionary key
-                value = str(value)
-
-                group_nodes[attr_key].record_count += 1
-                if value not in group_nodes[attr_key].unique_values:
-                    group_nodes[attr_key].unique_values[value] = 1
                 else:
-                    group_nodes[attr_key].unique_values[value] += 1
+                    if node.numeric_profile:
+                        node.numeric_profile.add(value)
+                    # Ensure value is always a string for dictionary key
+                    value = str(value)
+                    if self.join_signatures is not None:
+                        self.update_join_signature(attr_key, value)
+                    if node.pattern_profile:
+                        node.pattern_profile.add(value)
+
+                node.record_count += 1
+                if self.pattern_only:
+                    pass  # only the pattern table is kept
+                elif value not in node.unique_values:
+                    node.unique_values[value] = 1
+                    if self.value_spill and self.value_spill.added(node, value):
+                        self.value_spill.spill(self.node_sets())
+                else:
+                    node.unique_values[value] += 1
+                if self.drill_down and self.current_pointer and not self.pattern_only:
+                    self.add_value_pointer(node, value)
 
     def update_node(self, prior_key, key, value):
         attr_key = f"{prior_key}.{key}" if key else prior_key
-        if attr_key not in self.nodes:
-            self.nodes[attr_key] = Node(attr_key)
-            self.nodes[attr_key].node_desc = attr_key.replace("root.", "")
-            self.nodes[attr_key].node_type = "unk"
-
-            self.nodes[attr_key].record_count = 0
-            self.nodes[attr_key].unique_values = {}
-            self.nodes[prior_key].add_child(self.nodes[attr_key])
+        node = self.nodes.get(attr_key) or self.create_node(self.nodes, prior_key, attr_key)
 
         if value is not None:
             # Handle numpy arrays and other array-like objects
             try:
-                if hasattr(value, '__len__') and not isinstance(value, str):
+                if isinstance(value, str):
+                    # Most values, compacted csv cells are never empty
+                    is_empty = not value
+                elif hasattr(value, '__len__'):
                     # Check if it's empty for arrays/lists
                     is_empty = len(value) == 0
                 else:
@@ -469,22 +1441,106 @@ class FileAnalyzer:
                 is_empty = False
 
             if not is_empty:
-                if self.nodes[attr_key].node_type == "unk":
-                    self.nodes[attr_key].node_type = str(type(value))[8:-2]
+                if node.node_type == "unk":
+                    node.node_type = str(type(value))[8:-2]
 
                 if isinstance(value, (dict, list)):
                     value = f"{len(value)} items"
-                elif isinstance(value, np.ndarray):
+                elif isinstance(value, ARRAY_TYPES):
                     value = f"array({value.shape}) items"
-
-                # Ensure value is always a string for dictionary key
-                value = str(value)
-
-                self.nodes[attr_key].record_count += 1
-                if value not in self.nodes[attr_key].unique_values:
-                    self.nodes[attr_key].unique_values[value] = 1
                 else:
-                    self.nodes[attr_key].unique_values[value] += 1
+                    if node.numeric_profile:
+                        node.numeric_profile.add(value)
+                    # Ensure value is always a string for dictionary key
+                    value = str(value)
+                    if self.join_signatures is not None:
+                        self.update_join_signature(attr_key, value)
+                    if node.pattern_profile:
+                        node.pattern_profile.add(value)
+
+                node.record_count += 1
+                if self.pattern_only:
+                    pass  # only the pattern table is kept
+                elif value not in node.unique_values:
+                    node.unique_values[value] = 1
+                    if self.value_spill and self.value_spill.added(node, value):
+                        self.value_spill.spill(self.node_sets())
+                else:
+                    node.unique_values[value] += 1
+                if self.drill_down and self.current_pointer and not self.pattern_only:
+                    self.add_value_pointer(node, value)
+
+    def node_sets(self):
+        """Return the node dicts of the whole file and of each group"""
+        return [self.nodes] + [group_data["nodes"] for group_data in (self.groups or {}).values()]
+
+    def create_group(self, group_value):
+        """Add a group with its own root node"""
+        self.groups[group_value] = {
+            "nodes": {"root": Node("root")},
+            "record_count": 0
+        }
+        root_node = self.groups[group_value]["nodes"]["root"]
+        root_node.node_desc = f"root ({group_value})"
+        root_node.node_type = self.root_node.node_type
+        for attr_name in self.flat_attributes:
+            if attr_name != self.group_by_attr:
+                self.create_node(self.groups[group_value]["nodes"], "root", f"root.{attr_name}")
+
+    def register_attributes(self, attr_names):
+        """Create the nodes of a flat file's columns in header order, so compacted rows keep
+        the column order and never populated columns still appear with a zero count"""
+        for attr_name in attr_names:
+            if attr_name and attr_name not in self.flat_attributes:
+                self.flat_attributes.append(attr_name)
+                if f"root.{attr_name}" not in self.nodes:
+                    self.create_node(self.nodes, "root", f"root.{attr_name}")
+                for group_value, group_data in (self.groups or {}).items():
+                    if attr_name != self.group_by_attr and f"root.{attr_name}" not in group_data["nodes"]:
+                        self.create_node(group_data["nodes"], "root", f"root.{attr_name}")
+
+    def create_node(self, nodes, prior_key, attr_key):
+        """Add an attribute node under its parent"""
+        node = Node(attr_key)
+        node.node_desc = attr_key.replace("root.", "")
+        node.node_type = "unk"
+        node.record_count = 0
+        node.unique_values = {}
+        node.unique_bytes = 0  # estimated memory of unique_values, only tracked with a value_spill
+        node.spill_runs = []
+        node.spill_offset = 0
+        node.spill_summary = None
+        node.numeric_profile = NumericProfile() if self.numeric_profiles else None
+        node.pattern_profile = PatternProfile() if self.pattern_profiles else None
+        node.value_pointers = {}
+        nodes[attr_key] = node
+        nodes[prior_key].add_child(node)
+        return node
+
+    def add_pointer(self, pointers, key):
+        """Remember where the current record is for key, up to drill_down records per key"""
+        key_pointers = pointers.get(key)
+        if key_pointers is None:
+            pointers[key] = [self.current_pointer]
+        elif len(key_pointers) < self.drill_down and key_pointers[-1] is not self.current_pointer:
+            key_pointers.append(self.current_pointer)
+
+    def add_value_pointer(self, node, value):
+        """Remember where the current record is for an attribute value, for a bounded number of values"""
+        pointers = node.value_pointers
+        if value not in pointers and len(pointers) >= self.max_pointer_values:
+            # drop the less frequent half, a top value is soon seen again and gets new pointers
+            counts = node.unique_values
+            keep = heapq.nlargest(self.max_pointer_values // 2, pointers, key=lambda x: counts.get(x, 0))
+            node.value_pointers = pointers = {x: pointers[x] for x in keep}
+        self.add_pointer(pointers, value)
+
+    def update_join_signature(self, attr_key, value):
+        """Add a scalar value to the join signature of this attribute in the current file"""
+        signature_key = (self.current_file, attr_key)
+        if signature_key not in self.join_signatures:
+            self.join_signatures[signature_key] = JoinSignature()
+        self.join_signatures[signature_key].add(value)
 
     def matches_filter(self, obj, filter_attr, filter_value):
         """Check if object matches the filter criteria"""
@@ -500,228 +1556,164 @@ class FileAnalyzer:
         return str(current) == filter_value
 
     def generate(self, template):
-        if self.group_by_attr and template == "report":
-            return self.generate_grouped_report()
-        elif template == "report":
-            return self.generate_standard_report()
+        if template == "report":
+            return list(self.iter_report())
         else:
             return self.generate_code_template()
 
+    def iter_report(self):
+        """Yield the schema report header and rows one at a time as the tree is walked"""
+        if self.group_by_attr:
+            return self.iter_grouped_report()
+        return self.iter_standard_report()
+
+    def walk_nodes(self, root_node):
+        """Yield the nodes under root_node depth first, in the order they were found"""
+        stack = [iter(root_node.children)]
+        while stack:
+            next_node = next(stack[-1], None)
+            if next_node is None:
+                stack.pop()
+                continue
+            yield next_node
+            if next_node.children:
+                stack.append(iter(next_node.children))
+
+    def report_row(self, node, record_count):
+        """Return the attribute, count, uniqueness, numeric and top value columns for a node"""
+        record_pct = round(node.record_count / record_count * 100, 2) if record_count else 0
+        unique_cnt, unique_pct = self.get_unique_stats(node)
+
+        top_values = [""] * self.top_value_count
+        if self.top_value_count:
+            for i, (k, v) in enumerate(self.get_top_values(node, self.top_value_count)):
+                top_values[i] = f"{str(k)[0:50]} ({v})"
+
+        return [node.node_desc, node.node_type, node.record_count, record_pct, unique_cnt, unique_pct] \
+            + self.get_numeric_summary(node) + top_values
+
     def generate_grouped_report(self):
         """Generate a grouped report with schema as first column"""
+        return list(self.iter_grouped_report())
+
+    def iter_grouped_report(self):
         header = [self.group_by_attr, "attribute", "type", "record_cnt", "record_pct", "unique_cnt", "unique_pct"]
+        header.extend(["min", "p1", "p50", "p99", "max"])
         header.extend([f"top_value{i+1}" for i in range(self.top_value_count)])
-        
-        rows = []
+        yield header
+
         for group_value in sorted(self.groups.keys()):
             group_data = self.groups[group_value]
-            group_nodes = group_data["nodes"]
-            group_record_count = group_data["record_count"]
-            
-            # Traverse nodes for this group
-            root_node = group_nodes["root"]
-            parents = [{"node": root_node, "children": root_node.children.copy()}]
-            while parents:
-                if len(parents[-1]["children"]) == 0:
-                    parents.pop()
-                    continue
-                next_node = parents[-1]["children"][0]
-                parents[-1]["children"].pop(0)
-
-                attr_code = next_node.node_desc
-                attr_type = next_node.node_type
-                record_cnt = next_node.record_count
-                record_pct = round(record_cnt / group_record_count * 100, 2) if group_record_count else 0
-                unique_cnt = len(next_node.unique_values)
-                unique_pct = round(unique_cnt / record_cnt * 100, 2) if record_cnt else 0
-
-                top_values = [""] * self.top_value_count
-                if self.top_value_count:
-                    i = 0
-                    for k, v in sorted(next_node.unique_values.items(), key=lambda v: v[1], reverse=True):
-                        top_values[i] = f"{str(k)[0:50]} ({v})"
-                        i += 1
-                        if i == self.top_value_count:
-                            break
-
-                rows.append([group_value, attr_code, attr_type, record_cnt, record_pct, unique_cnt, unique_pct] + top_values)
-
-                if next_node.children:
-                    parents.append({"node": next_node, "children": next_node.children.copy()})
-        
-        return [header] + rows
+            for next_node in self.walk_nodes(group_data["nodes"]["root"]):
+                yield [group_value] + self.report_row(next_node, group_data["record_count"])
 
     def generate_standard_report(self):
         """Generate the standard non-grouped report"""
+        return list(self.iter_standard_report())
+
+    def iter_standard_report(self):
         header = ["attribute", "type", "record_cnt", "record_pct", "unique_cnt", "unique_pct"]
+        header.extend(["min", "p1", "p50", "p99", "max"])
         header.extend([f"top_value{i+1}" for i in range(self.top_value_count)])
+        yield header
 
-        rows = []
-        root_node = self.root_node
-        parents = [{"node": root_node, "children": root_node.children.copy()}]
-        while parents:
-            if len(parents[-1]["children"]) == 0:
-                parents.pop()
-                continue
-            next_node = parents[-1]["children"][0]
-            parents[-1]["children"].pop(0)
-
-            attr_code = next_node.node_desc
-            attr_type = next_node.node_type
-            record_cnt = next_node.record_count
-            record_pct = round(record_cnt / self.record_count * 100, 2)
-            unique_cnt = len(next_node.unique_values)
-            unique_pct = round(unique_cnt / record_cnt * 100, 2) if record_cnt else 0
-
-            top_values = [""] * self.top_value_count
-            if self.top_value_count:
-                i = 0
-                for k, v in sorted(next_node.unique_values.items(), key=lambda v: v[1], reverse=True):
-                    top_values[i] = f"{str(k)[0:50]} ({v})"
-                    i += 1
-                    if i == self.top_value_count:
-                        break
-
-            rows.append([attr_code, attr_type, record_cnt, record_pct, unique_cnt, unique_pct] + top_values)
-
-            if next_node.children:
-                parents.append({"node": next_node, "children": next_node.children.copy()})
+        for next_node in self.walk_nodes(self.root_node):
+            yield self.report_row(next_node, self.record_count)
 
-        return [header] + rows
+    def get_unique_stats(self, node, precision=2):
+        """Return (unique_cnt, unique_pct) for a node, blank when values are not kept (pattern only mode)"""
+        if self.pattern_only:
+            return "", ""
+        if node.spill_runs:
+            unique_cnt = self.value_spill.summary(node, max(self.top_value_count, 10))[0]
+        else:
+            unique_cnt = len(node.unique_values)
+        unique_pct = round(unique_cnt / node.record_count * 100, precision) if node.record_count else 0
+        return unique_cnt, unique_pct
+
+    def get_top_values(self, node, count):
+        """Return the most frequent (value, count) pairs of a node, or its top patterns in pattern only mode"""
+        if self.pattern_only:
+            return node.pattern_profile.top(count) if node.pattern_profile else []
+        if node.spill_runs:
+            return self.value_spill.summary(node, max(self.top_value_count, 10))[1][:count]
+        return heapq.nlargest(count, node.unique_values.items(), key=lambda v: v[1])
+
+    def get_numeric_summary(self, node):
+        """Return the [min, p1, p50, p99, max] columns for a node, blank if not numeric or a date"""
+        if getattr(node, "numeric_profile", None):
+            return node.numeric_profile.summary()
+        return [""] * 5
 
     def generate_markdown_report(self):
         """Generate markdown format schema report"""
-        lines = []
+        return "\n".join(self.iter_markdown_report())
 
+    def iter_markdown_report(self):
+        """Yield the markdown schema report line by line"""
         if self.group_by_attr:
             # Multi-schema markdown format
             total_schemas = len(self.groups)
             total_fields = sum(len(group_data["nodes"]) - 1 for group_data in self.groups.values())  # -1 to exclude root
 
-            lines.append(f"**Total Schemas:** {total_schemas}")
-            lines.append(f"**Total Fields:** {total_fields}")
-            lines.append("")
+            yield f"**Total Schemas:** {total_schemas}"
+            yield f"**Total Fields:** {total_fields}"
+            yield ""
 
             for group_value in sorted(self.groups.keys()):
                 group_data = self.groups[group_value]
-                group_nodes = group_data["nodes"]
-                group_record_count = group_data["record_count"]
-                field_count = len(group_nodes) - 1  # Exclude root node
-
-                lines.append(f"## Schema: {group_value}")
-                lines.append("")
-                lines.append(f"**Record Count:** {group_record_count}")
-                lines.append(f"**Field Count:** {field_count}")
-                lines.append("")
-                lines.append("### Fields")
-                lines.append("")
-                lines.append("| # | Field Name | Type | Records | Pop % | Unique % | Sample Values |")
-                lines.append("|---|------------|------|---------|-------|----------|---------------|")
-
-                # Traverse nodes for this group
-                row_num = 0
-                root_node = group_nodes["root"]
-                parents = [{"node": root_node, "children": root_node.children.copy()}]
-                while parents:
-                    if len(parents[-1]["children"]) == 0:
-                        parents.pop()
-                        continue
-                    next_node = parents[-1]["children"][0]
-                    parents[-1]["children"].pop(0)
-
-                    row_num += 1
-                    field_name = next_node.node_desc
-                    field_type = next_node.node_type
-                    record_cnt = next_node.record_count
-                    pop_pct = f"{round(record_cnt / group_record_count * 100, 1)}%" if group_record_count else "0%"
-                    unique_cnt = len(next_node.unique_values)
-                    unique_pct = f"{round(unique_cnt / record_cnt * 100, 1)}%" if record_cnt else "0%"
-
-                    # Get top 5 sample values
-                    samples = []
-                    for k, v in sorted(next_node.unique_values.items(), key=lambda v: v[1], reverse=True)[:5]:
-                        samples.append(str(k)[:30])
-                    sample_str = ", ".join(samples)
-
-                    lines.append(f"| {row_num} | {field_name} | {field_type} | {record_cnt} | {pop_pct} | {unique_pct} | {sample_str} |")
-
-                    if next_node.children:
-                        parents.append({"node": next_node, "children": next_node.children.copy()})
-
-                lines.append("")
+                yield from self.iter_markdown_schema(group_value, group_data["nodes"]["root"],
+                                                     group_data["record_count"], len(group_data["nodes"]) - 1)
+                yield ""
         else:
             # Single-schema markdown format
             field_count = len(self.nodes) - 1  # Exclude root node
             schema_name = pathlib.Path(self.file_name).stem
 
-            lines.append(f"**Total Schemas:** 1")
-            lines.append(f"**Total Fields:** {field_count}")
-            lines.append("")
-            lines.append(f"## Schema: {schema_name}")
-            lines.append("")
-            lines.append(f"**Record Count:** {self.record_count}")
-            lines.append(f"**Field Count:** {field_count}")
-            lines.append("")
-            lines.append("### Fields")
-            lines.append("")
-            lines.append("| # | Field Name | Type | Records | Pop % | Unique % | Sample Values |")
-            lines.append("|---|------------|------|---------|-------|----------|---------------|")
-
-            # Traverse nodes
-            row_num = 0
-            root_node = self.root_node
-            parents = [{"node": root_node, "children": root_node.children.copy()}]
-            while parents:
-                if len(parents[-1]["children"]) == 0:
-                    parents.pop()
-                    continue
-                next_node = parents[-1]["children"][0]
-                parents[-1]["children"].pop(0)
-
-                row_num += 1
-                field_name = next_node.node_desc
-                field_type = next_node.node_type
-                record_cnt = next_node.record_count
-                pop_pct = f"{round(record_cnt / self.record_count * 100, 1)}%" if self.record_count else "0%"
-                unique_cnt = len(next_node.unique_values)
-                unique_pct = f"{round(unique_cnt / record_cnt * 100, 1)}%" if record_cnt else "0%"
-
-                # Get top 5 sample values
-                samples = []
-                for k, v in sorted(next_node.unique_values.items(), key=lambda v: v[1], reverse=True)[:5]:
-                    samples.append(str(k)[:30])
-                sample_str = ", ".join(samples)
-
-                lines.append(f"| {row_num} | {field_name} | {field_type} | {record_cnt} | {pop_pct} | {unique_pct} | {sample_str} |")
+            yield f"**Total Schemas:** 1"
+            yield f"**Total Fields:** {field_count}"
+            yield ""
+            yield from self.iter_markdown_schema(schema_name, self.root_node, self.record_count, field_count)
+
+    def iter_markdown_schema(self, schema_name, root_node, record_count, field_count):
+        yield f"## Schema: {schema_name}"
+        yield ""
+        yield f"**Record Count:** {record_count}"
+        yield f"**Field Count:** {field_count}"
+        yield ""
+        yield "### Fields"
+        yield ""
+        yield "| # | Field Name | Type | Records | Pop % | Unique % | Min | P1 | P50 | P99 | Max | Sample Values |"
+        yield "|---|------------|------|---------|-------|----------|-----|----|-----|-----|-----|---------------|"
+
+        for row_num, next_node in enumerate(self.walk_nodes(root_node), 1):
+            field_name = next_node.node_desc
+            field_type = next_node.node_type
+            record_cnt = next_node.record_count
+            pop_pct = f"{round(record_cnt / record_count * 100, 1)}%" if record_count else "0%"
+            unique_cnt, unique_pct = self.get_unique_stats(next_node, 1)
+            unique_pct = f"{unique_pct}%" if unique_pct != "" else ""
 
-                if next_node.children:
-                    parents.append({"node": next_node, "children": next_node.children.copy()})
+            # Get top 5 sample values
+            sample_str = ", ".join(str(k)[:30] for k, v in self.get_top_values(next_node, 5))
 
-        return "\n".join(lines)
+            range_str = " | ".join(str(x) for x in self.get_numeric_summary(next_node))
+            yield f"| {row_num} | {field_name} | {field_type} | {record_cnt} | {pop_pct} | {unique_pct} | {range_str} | {sample_str} |"
 
     def generate_code_template(self):
         """Generate code template (non-grouped only for now)"""
         rows = []
-        root_node = self.root_node
-        parents = [{"node": root_node, "children": root_node.children.copy()}]
-        while parents:
-            if len(parents[-1]["children"]) == 0:
-                parents.pop()
-                continue
-            next_node = parents[-1]["children"][0]
-            parents[-1]["children"].pop(0)
-
+        for next_node in self.walk_nodes(self.root_node):
             attr_code = next_node.node_desc
             attr_type = next_node.node_type
             record_cnt = next_node.record_count
             record_pct = round(record_cnt / self.record_count * 100, 2)
-            unique_cnt = len(next_node.unique_values)
-            unique_pct = round(unique_cnt / record_cnt * 100, 2) if record_cnt else 0
+            unique_cnt, unique_pct = self.get_unique_stats(next_node)
 
             top_values = [""] * self.top_value_count
             if self.top_value_count:
                 i = 0
-                for k, v in sorted(next_node.unique_values.items(), key=lambda v: v[1], reverse=True):
+                for k, v in self.get_top_values(next_node, self.top_value_count):
                     top_values[i] = f"{str(k)[0:50]} ({v})"
                     i += 1
                     if i == self.top_value_count:
@@ -742,7 +1734,7 @@ class FileAnalyzer:
             for item in (item for item in top_values if item):
                 rows.append(f"{indent}#      {item}")
 
-            if attr_type in ("list", "np.ndarray"):
+            if attr_type in ("list", "numpy.ndarray"):
                 new_data = f"raw_data{len(attr_list)}"
                 rows.append(f'{indent}for {new_data} in self.ensure_list({prior_data}.get("{last_attr}")):')
             elif attr_type in ("dict"):
@@ -750,12 +1742,9 @@ class FileAnalyzer:
                 rows.append(f'{indent}if {prior_data}.get("{last_attr}"):')
                 rows.append(f'{indent}    {new_data} = {prior_data}.get("{last_attr}")')
             else:
-                item = f'"{last_attr}": {prior_data}["{last_attr}"]'
+                item = f'"{last_attr}": {prior_data}.get("{last_attr}")'
                 rows.append(indent + "json_obj.add_payload({" + item + "})")
 
-            if next_node.children:
-                parents.append({"node": next_node, "children": next_node.children.copy()})
-
         return rows
 
     def generate_enumeration_report(self):
@@ -936,6 +1925,244 @@ class FileAnalyzer:
         
         return [header] + rows
 
+    def generate_join_candidates_report(self):
+        """Generate report of attribute pairs whose value sets overlap enough to be join keys"""
+        header = ["file1", "attribute1", "file2", "attribute2", "distinct1", "distinct2", "shared_est",
+                  "containment1_in_2", "containment2_in_1", "jaccard"]
+
+        signatures = []
+        for (file_name, attr_key), signature in self.join_signatures.items():
+            distinct_cnt = signature.minhash.distinct_estimate()
+            if distinct_cnt > 1:
+                signatures.append((file_name, attr_key.replace("root.", ""), signature, distinct_cnt))
+
+        rows = []
+        for i, (file1, attr1, signature1, distinct1) in enumerate(signatures):
+            for file2, attr2, signature2, distinct2 in signatures[i + 1:]:
+                # the referenced (key) side must have enough values to not just be a code list
+                if max(distinct1, distinct2) < self.join_min_distinct:
+                    continue
+                containment1 = signature1.containment_in(signature2)
+                containment2 = signature2.containment_in(signature1)
+                if max(containment1, containment2) < self.join_threshold:
+                    continue
+                # the smaller side's sample is the more complete one
+                if distinct1 <= distinct2:
+                    shared_cnt = round(containment1 * distinct1)
+                else:
+                    shared_cnt = round(containment2 * distinct2)
+                if shared_cnt < self.join_min_shared:
+                    continue
+                rows.append([file1, attr1, file2, attr2, distinct1, distinct2, shared_cnt,
+                             round(containment1 * 100, 2), round(containment2 * 100, 2),
+                             round(signature1.jaccard(signature2) * 100, 2)])
+
+        rows.sort(key=lambda x: (x[6], max(x[7], x[8])), reverse=True)
+        return [header] + rows
+
+    def generate_key_discovery_report(self):
+        """Generate report of attributes and attribute combinations that could be a unique record key"""
+        header = ["attributes", "attr_count", "populated_pct", "unique_est", "unique_pct",
+                  "exact_unique", "exact_duplicates", "status"]
+        discovery = self.key_discovery
+        discovery.finish()
+        record_count = discovery.record_count
+
+        rows = []
+        candidates = list(discovery.singles.values()) + discovery.combos
+        for candidate in candidates:
+            if len(candidate.attrs) == 1:
+                candidate_record_cnt = record_count
+                unique_est = min(candidate.hll.estimate(), candidate.populated_cnt)
+            else:
+                # combinations dropped early report the counts seen up to that point
+                candidate_record_cnt = candidate.record_cnt
+                unique_est = min(candidate.hll.estimate(), candidate_record_cnt)
+            unique_pct = round(unique_est / candidate_record_cnt * 100, 2) if candidate_record_cnt else 0
+            if len(candidate.attrs) == 1 and unique_pct < self.key_min_unique_pct:
+                continue
+            populated_pct = round(candidate.populated_cnt / candidate_record_cnt * 100, 2) if candidate_record_cnt else 0
+
+            exact_unique = exact_duplicates = ""
+            if candidate.exact_counts:
+                exact_unique, exact_duplicates = candidate.exact_counts
+                if exact_duplicates:
+                    status = "duplicates"
+                elif candidate.populated_cnt < record_count:
+                    status = "unique, not always populated"
+                else:
+                    status = "unique key"
+            elif candidate.dropped or unique_pct < discovery.min_unique_pct - 2:
+                status = "duplicates"
+            elif unique_pct >= discovery.min_unique_pct and candidate.populated_cnt == candidate_record_cnt:
+                status = "likely key"
+            else:
+                status = "near key"
+
+            rows.append([" + ".join(attr for attr in candidate.attrs), len(candidate.attrs), populated_pct,
+                         unique_est, unique_pct, exact_unique, exact_duplicates, status])
+
+        rows.sort(key=lambda x: (x[1], -x[4], -x[2]))
+        return [header] + rows
+
+    def generate_pattern_report(self):
+        """Generate report of the most frequent value patterns for each attribute"""
+        header = ["attribute", "pattern", "record_cnt", "record_pct", "example1", "example2", "example3"]
+        rows = []
+        for node in self.nodes.values():
+            if not getattr(node, "pattern_profile", None):
+                continue
+            profile = node.pattern_profile
+            for pattern, count in profile.top(self.top_value_count):
+                examples = (profile.patterns[pattern][2] + [""] * PatternProfile.max_examples)[:PatternProfile.max_examples]
+                record_pct = round(count / profile.total * 100, 2) if profile.total else 0
+                rows.append([node.node_desc, pattern, count, record_pct] + examples)
+        return [header] + rows
+
+    def generate_drill_down_index(self):
+        """Build the drill-down index: record pointers for each top value and enumeration code"""
+        entries = []
+        if self.groups is not None:
+            node_sets = [(group_value, self.groups[group_value]["nodes"]) for group_value in sorted(self.groups.keys())]
+        else:
+            node_sets = [(None, self.nodes)]
+        for group_value, nodes in node_sets:
+            for node in nodes.values():
+                if not getattr(node, "value_pointers", None):
+                    continue
+                for value, count in self.get_top_values(node, self.top_value_count):
+                    if value in node.value_pointers:
+                        entries.append({"group": group_value, "attribute": node.node_desc, "value": value,
+                                        "count": count, "pointers": node.value_pointers[value]})
+
+        code_sets = []
+        if self.enumeration_stats:
+            if self.group_by_attr:
+                for group_value, group_stats in self.enumeration_stats.items():
+                    code_sets.extend((group_value, attr_path, attr_stats) for attr_path, attr_stats in group_stats.items())
+            else:
+                code_sets.extend((None, attr_path, attr_stats) for attr_path, attr_stats in self.enumeration_stats.items())
+        elif self.pivot_stats:
+            pivot_sets = self.pivot_stats.items() if self.group_by_attr else [(None, self.pivot_stats)]
+            for group_value, group_pivot_stats in pivot_sets:
+                for grouping_key, value_stats in group_pivot_stats.items():
+                    attribute = f"{self.enumerate_config['value_attr']} ({', '.join(grouping_key)})"
+                    code_sets.append((group_value, attribute, value_stats))
+        for group_value, attribute, attr_stats in code_sets:
+            for code_value, stats in attr_stats.items():
+                if stats.get('pointers'):
+                    entries.append({"group": group_value, "attribute": attribute, "value": code_value,
+                                    "count": stats['count'], "pointers": stats['pointers']})
+
+        return {"version": 1, "files": self.drill_files, "entries": entries}
+
+    def snapshot(self):
+        """Export the analysis state (schema tree, counts, groups, enumeration and pivot stats) as a dict"""
+        state = {
+            "version": SNAPSHOT_VERSION,
+            "file_name": self.file_name,
+            "file_type": self.file_type,
+            "record_count": self.record_count,
+            "group_by_attr": self.group_by_attr,
+            "enumerate_config": self.enumerate_config if self.is_pivot_enumeration else self.enumerate_attrs,
+            "numeric_profiles": self.numeric_profiles,
+            "pattern_profiles": self.pattern_profiles,
+            "pattern_only": self.pattern_only,
+            "nodes": self.node_states(self.root_node),
+        }
+        if self.groups is not None:
+            state["groups"] = [[group_value, group_data["record_count"], self.node_states(group_data["nodes"]["root"])]
+                               for group_value, group_data in self.groups.items()]
+        depth = 2 if self.group_by_attr else 1
+        if self.enumeration_stats is not None:
+            state["enumeration_stats"] = self.code_stats_state(self.enumeration_stats, depth)
+        if self.pivot_stats is not None:
+            state["pivot_stats"] = self.code_stats_state(self.pivot_stats, depth)
+        return state
+
+    @classmethod
+    def from_snapshot(cls, state):
+        analyzer = cls(state["file_name"], state["file_type"], state["group_by_attr"], state["enumerate_config"])
+        analyzer.numeric_profiles = state["numeric_profiles"]
+        analyzer.pattern_profiles = state["pattern_profiles"]
+        analyzer.pattern_only = state["pattern_only"]
+        analyzer.merge_snapshot(state)
+        return analyzer
+
+    def merge_snapshot(self, state):
+        """Add the counts of another partition's snapshot, in partition order so reports match a single run"""
+        if state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {state.get('version')}")
+        enumerate_config = self.enumerate_config if self.is_pivot_enumeration else self.enumerate_attrs
+        for setting, value in (("group_by_attr", self.group_by_attr), ("enumerate_config", enumerate_config),
+                               ("numeric_profiles", self.numeric_profiles), ("pattern_only", self.pattern_only)):
+            if state[setting] != value:
+                raise ValueError(f"snapshots were taken with different {setting} settings")
+        if self.record_count:
+            self.file_name += " " + state["file_name"]
+
+        record_offset = self.record_count  # generated record_N ids continue from the prior partitions
+        self.record_count += state["record_count"]
+        self.merge_node_states(self.nodes, state["nodes"])
+        for group_value, record_count, node_states in state.get("groups", []):
+            if group_value not in self.groups:
+                self.create_group(group_value)
+            self.groups[group_value]["record_count"] += record_count
+            self.merge_node_states(self.groups[group_value]["nodes"], node_states)
+        depth = 2 if self.group_by_attr else 1
+        if self.enumeration_stats is not None:
+            self.merge_code_stats(self.enumeration_stats, state["enumeration_stats"], depth, record_offset)
+        if self.pivot_stats is not None:
+            self.merge_code_stats(self.pivot_stats, state["pivot_stats"], depth, record_offset)
+
+    def node_states(self, root_node):
+        """List a node tree parents first as [attr_key, parent_key, type, record_count, unique_values, numeric, patterns]"""
+        states = []
+        parents = [root_node]
+        while parents:
+            parent = parents.pop()
+            for node in parent.children:
+                states.append([node.node_id, parent.node_id, node.node_type, node.record_count, node.unique_values,
+                               node.numeric_profile.to_state() if node.numeric_profile else None,
+                               node.pattern_profile.to_state() if node.pattern_profile else None])
+            parents.extend(reversed(parent.children))
+        return states
+
+    def merge_node_states(self, nodes, states):
+        for attr_key, parent_key, node_type, record_count, unique_values, numeric, patterns in states:
+            node = nodes.get(attr_key) or self.create_node(nodes, parent_key, attr_key)
+            if node.node_type == "unk":
+                node.node_type = node_type
+            node.record_count += record_count
+            for value, count in unique_values.items():
+                node.unique_values[value] = node.unique_values.get(value, 0) + count
+            if numeric and node.numeric_profile:
+                node.numeric_profile.merge(NumericProfile.from_state(numeric))
+            if patterns and node.pattern_profile:
+                node.pattern_profile.merge(PatternProfile.from_state(patterns))
+
+    def code_stats_state(self, stats, depth):
+        """Nested enumeration or pivot stats as lists, depth levels of keys above the code values"""
+        if not depth:
+            return [[code_value, code_stats["count"], list(code_stats["records"])]
+                    for code_value, code_stats in stats.items()]
+        return [[list(key) if isinstance(key, tuple) else key, self.code_stats_state(value, depth - 1)]
+                for key, value in stats.items()]
+
+    def merge_code_stats(self, stats, states, depth, record_offset):
+        if not depth:
+            for code_value, count, records in states:
+                if code_value not in stats:
+                    stats[code_value] = {'count': 0, 'records': set()}
+                stats[code_value]['count'] += count
+                stats[code_value]['records'].update(offset_record_id(record_id, record_offset) for record_id in records)
+            return
+        for key, value in states:
+            key = tuple(key) if isinstance(key, list) else key
+            if key not in stats:
+                stats[key] = {}
+            self.merge_code_stats(stats[key], value, depth - 1, record_offset)
+
 
 def create_python_script(code_rows, file_type, encoding):
     """Generate Python script from template with improved modularity"""
@@ -1042,6 +2269,8 @@ def get_mapper_call(file_type):
     """Get the appropriate mapper call for the file type"""
     if file_type in ["json", "jsonl"]:
         return "for json_data in mapper.map(json.loads(row)):"
+    elif file_type == "csv":
+        return "for json_data in mapper.map(compact_row(row)):"
     else:
         return "for json_data in mapper.map(row):"
 
@@ -1141,22 +2370,48 @@ def element_to_dict(element):
     return result
 
 
-def report_viewer(report):
-    table_object = prettytable.PrettyTable()
-    table_object.horizontal_char = "\u2500"
-    table_object.vertical_char = "\u2502"
-    table_object.junction_char = "\u253c"
-    table_object.field_names = report[0]
-    table_object.add_rows(report[1:])
-    for column in report[0]:
-        if any(column.endswith(x) for x in ["cnt", "pct"]):
-            table_object.align[column] = "r"
-        else:
-            table_object.align[column] = "l"
-    report_str = table_object.get_string()
+def report_viewer(report, page_rows=100):
+    """Page a report (a list or a generator of rows, header first) through less, rendering page_rows
+    rows at a time so the first screen shows at once and only one page is held in memory"""
+    rows = iter(report)
+    header = next(rows)
+    widths = {column: len(str(column)) for column in header}
+    shown_widths = None
+    bottom_border = ""
     less = subprocess.Popen(["less", "-FMXSR"], stdin=subprocess.PIPE)
     try:
-        less.stdin.write(report_str.encode("utf-8"))
+        while True:
+            page = list(itertools.islice(rows, page_rows))
+            if not page and shown_widths:
+                break
+            for row in page:
+                for column, value in zip(header, row):
+                    widths[column] = max(widths[column], len(str(value)))
+
+            table_object = prettytable.PrettyTable()
+            table_object.horizontal_char = "\u2500"
+            table_object.vertical_char = "\u2502"
+            table_object.junction_char = "\u253c"
+            table_object.field_names = header
+            table_object.add_rows(page)
+            for column in header:
+                if any(column.endswith(x) for x in ["cnt", "pct"]):
+                    table_object.align[column] = "r"
+                else:
+                    table_object.align[column] = "l"
+            table_object.min_width = widths
+
+            # pages continue the table above them, a new header is only shown when columns got wider
+            new_header = widths != shown_widths
+            lines = table_object.get_string(header=new_header).split("\n")
+            bottom_border = lines.pop()
+            if not new_header:
+                lines.pop(0)
+            less.stdin.write(("\n".join(lines) + "\n").encode("utf-8"))
+            shown_widths = dict(widths)
+            if len(page) < page_rows:
+                break
+        less.stdin.write(bottom_border.encode("utf-8"))
         less.stdin.close()
         less.wait()
         print()
@@ -1164,6 +2419,138 @@ def report_viewer(report):
         print(f"\n{ex}\n")
 
 
+def save_schema_report(analyzer, output_file, quiet=False):
+    """Write the schema report as markdown (.md) or CSV with the file name and type lines first"""
+    output_ext = pathlib.Path(output_file).suffix.lower()
+    if output_ext == '.md':
+        with open(output_file, "w") as file:
+            separator = ""
+            for line in analyzer.iter_markdown_report():
+                file.write(separator + line)
+                separator = "\n"
+        if not quiet:
+            print(f"markdown schema saved to {output_file}\n")
+    else:
+        with open(output_file, "w") as file:
+            writer = csv.writer(file)
+            writer.writerows([
+                ["file_name", analyzer.file_name],
+                ["file_type", analyzer.file_type],
+                []
+            ])
+            writer.writerows(analyzer.iter_report())
+        if not quiet:
+            print(f"statistical report saved to {output_file}\n")
+
+
+def save_refreshed_report(analyzer, output_file):
+    """Write the report a --follow run keeps current, the enumeration report if one was asked for"""
+    if analyzer.enumeration_stats is not None or analyzer.pivot_stats is not None:
+        with open(output_file, "w") as file:
+            csv.writer(file).writerows(analyzer.generate_enumeration_report())
+    else:
+        save_schema_report(analyzer, output_file, quiet=True)
+
+
+def save_or_view_report(report_rows, output_file, report_name):
+    """Write an additional report to CSV, or page it on the console if no file name was given"""
+    if output_file:
+        with open(output_file, "w") as file:
+            writer = csv.writer(file)
+            writer.writerows(report_rows)
+        print(f"{report_name} saved to {output_file}\n")
+    elif load_prettytable():
+        report_viewer(report_rows)
+    else:
+        print("\n".join(" | ".join(str(x) for x in row) for row in report_rows) + "\n")
+
+
+def save_snapshot(analyzer, file_name):
+    """Write the analyzer state as JSON, gzipped if the file name ends in .gz"""
+    opener = gzip.open if file_name.endswith(".gz") else open
+    with opener(file_name, "wt", encoding="utf-8") as file:
+        json.dump(analyzer.snapshot(), file, separators=(",", ":"))
+    print(f"snapshot saved to {file_name}\n")
+
+
+def merge_snapshots(file_names):
+    """Combine snapshot files, in the order given, into one analyzer"""
+    analyzer = None
+    for file_name in file_names:
+        opener = gzip.open if file_name.endswith(".gz") else open
+        with opener(file_name, "rt", encoding="utf-8") as file:
+            state = json.load(file)
+        if analyzer:
+            analyzer.merge_snapshot(state)
+        else:
+            analyzer = FileAnalyzer.from_snapshot(state)
+        print(f"merged {file_name}: {state['record_count']:,} rows")
+    return analyzer
+
+
+def read_pointed_record(file_info, offset, file_handles):
+    """Seek to a record pointer and return the record as a dictionary"""
+    file_name = file_info["name"]
+    if file_name not in file_handles:
+        file_handles[file_name] = open(file_name, "rb")
+    file = file_handles[file_name]
+    if file_info["type"] == "csv":
+        if "fieldnames" not in file_info:
+            file.seek(0)
+            header_reader = csv.reader(OffsetLineReader(file, file_info["encoding"]), delimiter=file_info["delimiter"])
+            file_info["fieldnames"] = next(header_reader)
+        file.seek(offset)
+        row = next(csv.reader(OffsetLineReader(file, file_info["encoding"]), delimiter=file_info["delimiter"]))
+        return dict(zip(file_info["fieldnames"], row))
+    file.seek(offset)
+    return json.loads(file.readline().decode(file_info["encoding"]))
+
+
+def show_records(index_file_name, show_spec):
+    """Print the records a drill-down index points to for 'attribute=value', or list the indexed values"""
+    with open(index_file_name, "r") as file:
+        index = json.load(file)
+    attribute, _, value = show_spec.partition("=")
+    entries = [entry for entry in index["entries"] if entry["attribute"] == attribute]
+    if not entries:
+        print(f"\nNo drill-down entries for {attribute}\n")
+        return 1
+    if not value and "=" not in show_spec:
+        for entry in entries:
+            group = f"{entry['group']}: " if entry["group"] is not None else ""
+            print(f"{group}{entry['value']} ({entry['count']}), {len(entry['pointers'])} records indexed")
+        return 0
+
+    file_handles = {}
+    try:
+        shown = 0
+        for entry in entries:
+            if entry["value"] != value:
+                continue
+            for file_index, offset in entry["pointers"]:
+                file_info = index["files"][file_index]
+                record = read_pointed_record(file_info, offset, file_handles)
+                print(f"\n-- {file_info['name']} @ byte {offset}")
+                print(json.dumps(record, indent=4, default=str))
+                shown += 1
+    finally:
+        for file in file_handles.values():
+            file.close()
+    if not shown:
+        print(f"\nNo drill-down entries for {attribute}={value}\n")
+        return 1
+    print()
+    return 0
+
+
+def detect_file_type(file_name):
+    """Infer the file type from the file extension, defaulting to csv"""
+    ext = pathlib.Path(file_name).suffix.lower()
+    if ext in (".parquet", ".json", ".jsonl", ".xml", ".xmls"):  # Add .xmls to detection
+        return ext[1:] if ext != ".xmls" else "xml"  # Map .xmls to 'xml'
+    return "csv"
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Analyze file structure and generate statistics reports or code enumeration analyses.",
@@ -1185,6 +2572,34 @@ Filtering:
   %(prog)s data.jsonl --filter "status=active" -o filtered_schema.csv
   %(prog)s data.jsonl --group_by schema=Person --enumerate "properties:name:identifier" -o person_names.csv
 
+Join Key Discovery (attribute pairs whose values overlap, within and across files):
+  %(prog)s employees.csv companies.jsonl --join_candidates joins.csv
+
+Record Key Discovery (unique attributes and combinations of up to 3 attributes):
+  %(prog)s data.csv --key_discovery keys.csv --key_confirm
+
+Drill-Down (jump from a top value or code to example records):
+  %(prog)s data.csv -o schema.csv --drill_down index.json
+  %(prog)s index.json --show "state=NV"
+
+Drift Check (compare a new feed to a saved schema report, exit code 3 on drift):
+  %(prog)s new_feed.csv --baseline schema/feed-schema.csv --early_stop
+
+Distributed Scans (snapshot each partition, then merge the snapshots for the reports):
+  %(prog)s part1.jsonl --snapshot part1.snap.json.gz
+  %(prog)s part2.jsonl --snapshot part2.snap.json.gz
+  %(prog)s merge part1.snap.json.gz part2.snap.json.gz -o schema.csv -p mapper.py
+
+Follow a Growing Feed (report rewritten every 60 seconds or 10000 new rows, Ctrl-C to stop):
+  %(prog)s feed.jsonl -o schema.md --follow --refresh_rows 10000
+
+Memory Budget (move the largest unique value counts to disk instead of running out of memory):
+  %(prog)s huge.csv -o schema.csv --max_memory 4G --temp_dir /scratch
+
+Value Patterns (format distribution such as 999-99-9999 vs 999999999):
+  %(prog)s data.csv --patterns patterns.csv
+  %(prog)s data.csv --pattern_only -o schema.csv
+
 ENUMERATION FORMATS:
   Legacy: --enumerate "attr1,attr2"          (lists code values in specified attributes)
   Pivot:  --enumerate "level:dims:value"     (cross-tabulates dimensions against values)
@@ -1200,8 +2615,8 @@ GROUP_BY FORMATS:
         """,
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
-    parser.add_argument("input_file", 
-                       help="Input file path (supports CSV, JSON, JSONL, Parquet, XML)")
+    parser.add_argument("input_file", nargs="+",
+                       help="Input file path(s) or patterns (supports CSV, JSON, JSONL, Parquet, XML)")
     parser.add_argument("-t", "--file_type", 
                        help='File type: "csv", "jsonl", "json", "parquet", "xml" (auto-detected if not specified)')
     parser.add_argument("-e", "--encoding", default="utf-8", 
@@ -1221,25 +2636,105 @@ GROUP_BY FORMATS:
 Legacy: 'attr1,attr2' - list codes in attributes
 Pivot: 'level:dimensions:value' - cross-tabulate dimensions vs values
 Example: 'properties:type,country:number'""")
-    args = parser.parse_args()
-
-    if not args.input_file or not glob.glob(args.input_file):
+    parser.add_argument("--join_candidates", "--join-candidates", nargs="?", const="",
+                       help="Report attribute pairs whose values overlap enough to be join keys, "
+                            "optionally saved to this CSV file")
+    parser.add_argument("--join_threshold", type=float, default=50,
+                       help="Minimum estimated containment percent to list a join candidate (default: 50)")
+    parser.add_argument("--key_discovery", nargs="?", const="",
+                       help="Report attributes and attribute combinations that could be a unique record key, "
+                            "optionally saved to this CSV file")
+    parser.add_argument("--key_max_attrs", type=int, default=3,
+                       help="Largest attribute combination to consider for --key_discovery (default: 3)")
+    parser.add_argument("--key_confirm", action="store_true",
+                       help="Confirm key candidates exactly by sorting their hashes on disk")
+    parser.add_argument("--patterns", nargs="?", const="",
+                       help="Report the most frequent value patterns (e.g. 999-99-9999) per attribute, "
+                            "optionally saved to this CSV file")
+    parser.add_argument("--pattern_only", action="store_true",
+                       help="Keep only value patterns, not unique values (much less memory on high cardinality data)")
+    parser.add_argument("--drill_down",
+                       help="Save a drill-down index of record locations for each top value and code to this JSON file")
+    parser.add_argument("--drill_down_count", type=int, default=3,
+                       help="Records to index per top value or code (default: 3)")
+    parser.add_argument("--show",
+                       help="Show the records a drill-down index (given as input file) has for 'attribute=value', "
+                            "or list the indexed values of 'attribute'")
+    parser.add_argument("--baseline",
+                       help="Check the input for drift against this schema report CSV (from a prior -o file.csv run)")
+    parser.add_argument("--drift_tolerance", type=float, default=5,
+                       help="Population or uniqueness change in percent points to count as drift (default: 5)")
+    parser.add_argument("--drift_report",
+                       help="Save the drift findings to this CSV file instead of displaying them")
+    parser.add_argument("--early_stop", action="store_true",
+                       help="Stop reading as soon as --baseline drift is confirmed or ruled out")
+    parser.add_argument("--snapshot",
+                       help="Save the analysis state to this JSON file (.gz to compress) for a later merge")
+    parser.add_argument("--follow", action="store_true",
+                       help="Keep reading lines appended to a JSONL file (and its replacement after log rotation), "
+                            "refreshing the -o report as they arrive, until Ctrl-C")
+    parser.add_argument("--refresh_rows", type=int, default=0,
+                       help="With --follow, refresh the report after this many new rows (default: off)")
+    parser.add_argument("--refresh_interval", type=float, default=60,
+                       help="With --follow, refresh the report after this many seconds if there are new rows (default: 60)")
+    parser.add_argument("--no_quantiles", action="store_true",
+                       help="Skip numeric and date detection and the min/p1/p50/p99/max report columns")
+    parser.add_argument("--max_memory", "--max-memory",
+                       help="Memory budget for unique value counts, e.g. 512M or 4G; beyond it the largest "
+                            "attributes' counts move to sorted files in --temp_dir and are merged for the report")
+    parser.add_argument("--temp_dir",
+                       help="Directory for temporary spill files (default: system temp directory)")
+    # "merge snap1 snap2 ..." combines snapshot files instead of reading data files
+    merge_mode = len(sys.argv) > 1 and sys.argv[1] == "merge"
+    args = parser.parse_args(sys.argv[2:] if merge_mode else None)
+
+    if args.show:
+        sys.exit(show_records(args.input_file[0], args.show))
+
+    file_list = []
+    for file_spec in args.input_file:
+        file_list.extend(sorted(glob.glob(file_spec)))
+    if not file_list:
         print("\nPlease supply a valid input file specification on the command line\n")
         sys.exit(1)
-    file_list = glob.glob(args.input_file)
 
-    if not args.file_type:
-        ext = pathlib.Path(file_list[0]).suffix.lower()
-        if ext in (".parquet", ".json", ".jsonl", ".xml", ".xmls"):  # Add .xmls to detection
-            args.file_type = ext[1:] if ext != ".xmls" else "xml"  # Map .xmls to 'xml'
-        else:
-            args.file_type = "csv"
-    else:
-        args.file_type = args.file_type.lower()
+    if merge_mode:
+        if args.group_by or args.enumerate or args.filter or args.baseline:
+            print("\nError: grouping, enumeration, filter and baseline settings come from the snapshots when merging.\n")
+            sys.exit(1)
+        if args.join_candidates is not None or args.key_discovery is not None or args.drill_down or args.patterns is not None:
+            print("\nError: join, key, drill-down and pattern reports need the data files, they cannot be merged.\n")
+            sys.exit(1)
+        try:
+            merged_analyzer = merge_snapshots(file_list)
+        except (OSError, ValueError, KeyError) as err:
+            print(f"\nCould not merge snapshots: {err}\n")
+            sys.exit(1)
+        file_list = []
+        args.file_type = merged_analyzer.file_type
+
+    file_types = {}
+    for file_name in file_list:
+        file_types[file_name] = args.file_type.lower() if args.file_type else detect_file_type(file_name)
+    if file_list:
+        args.file_type = file_types[file_list[0]]
 
-    if args.file_type.lower() == "parquet" and not pd:
+    if "parquet" in file_types.values() and not load_pandas():
         print("\nPandas must be installed to analyze parquet files, try: pip3 install pandas\n")
         sys.exit(1)
+    if args.follow:
+        if len(file_list) != 1 or not file_types[file_list[0]].startswith("json") or not args.output_file:
+            print("\nError: --follow needs a single JSONL input file and -o/--output_file for the refreshed report.\n")
+            sys.exit(1)
+        if args.drill_down:
+            print("\nError: --drill_down cannot be used with --follow.\n")
+            sys.exit(1)
+    if args.max_memory and args.snapshot:
+        print("\nError: --snapshot cannot be used with --max_memory, spilled unique values are not kept in snapshots.\n")
+        sys.exit(1)
+    if args.baseline and args.group_by:
+        print("\nError: --baseline compares ungrouped schema reports and cannot be used with --group_by.\n")
+        sys.exit(1)
     if args.file_type.lower() in ("xml", "xmls") and not hasattr(ET, 'parse'):  # Update check to include xmls
         print("\nxml.etree.ElementTree is required for XML files.\n")
         sys.exit(1)
@@ -1271,30 +2766,73 @@ Example: 'properties:type,country:number'""")
             # Legacy syntax for backward compatibility
             enumerate_config = [attr.strip() for attr in args.enumerate.split(',')]
     
+    if merge_mode:
+        enumerate_config = merged_analyzer.enumerate_config or merged_analyzer.enumerate_attrs or None
+
     # Check for conflicting options
     if enumerate_config and not args.output_file:
         print("\nError: When using --enumerate, you must specify -o/--output_file for the enumeration CSV output.\n")
         sys.exit(1)
     
-    analyzer = FileAnalyzer(args.input_file, args.file_type, group_by_attr, enumerate_config)
+    if merge_mode:
+        analyzer = merged_analyzer
+    else:
+        analyzer = FileAnalyzer(" ".join(args.input_file), args.file_type, group_by_attr, enumerate_config)
+        analyzer.numeric_profiles = not args.no_quantiles
+        analyzer.pattern_profiles = args.patterns is not None or args.pattern_only
+        analyzer.pattern_only = args.pattern_only
     analyzer.top_value_count = args.top_values
+    if args.drill_down:
+        analyzer.drill_down = args.drill_down_count
+    if args.join_candidates is not None:
+        analyzer.join_signatures = {}
+        analyzer.join_threshold = args.join_threshold / 100
+    if args.key_discovery is not None:
+        analyzer.key_discovery = KeyDiscovery(args.key_max_attrs, args.key_confirm, args.temp_dir)
+    if args.max_memory:
+        try:
+            analyzer.value_spill = UniqueValueSpill(parse_size(args.max_memory), args.temp_dir)
+        except ValueError:
+            print(f"\nInvalid --max_memory size {args.max_memory}, try 512M or 4G\n")
+            sys.exit(1)
+        atexit.register(analyzer.value_spill.close)
+    drift_monitor = None
+    if args.baseline:
+        try:
+            drift_monitor = DriftMonitor(args.baseline, args.drift_tolerance)
+        except (OSError, ValueError, KeyError) as err:
+            print(f"\nCould not load baseline {args.baseline}: {err}\n")
+            sys.exit(1)
     
     # Set group_by filter if specified
     if group_by_filter:
         analyzer.group_by_filter = group_by_filter
 
+    refresher = None
+    if args.follow:
+        refresher = ReportRefresher(analyzer, args.output_file, save_refreshed_report, args.refresh_rows,
+                                    args.refresh_interval)
+
     try:
         file_num = 0
         for file_name in file_list:
             file_num += 1
             print(f"reading file {file_num} of {len(file_list)}: {file_name}")
-            if args.file_type == "parquet":
+            analyzer.current_file = file_name
+            file_type = file_types[file_name]
+            line_reader = None
+            if file_type == "parquet":
                 file = pd.read_parquet(file_name, engine="auto")  # Fix typo: fileName -> file_name
                 reader = iter(file.to_dict(orient="records"))
-            elif args.file_type.startswith("json"):
-                file = open(file_name, "r", encoding=args.encoding)
+            elif file_type.startswith("json"):
+                if refresher:
+                    file = FollowLineReader(file_name, args.encoding, on_idle=refresher.check)
+                elif analyzer.drill_down:
+                    file = line_reader = OffsetLineReader(open(file_name, "rb"), args.encoding)
+                else:
+                    file = open(file_name, "r", encoding=args.encoding)
                 reader = JsonReader(file)
-            elif args.file_type in ("xml", "xmls"):  # Update to include xmls
+            elif file_type in ("xml", "xmls"):  # Update to include xmls
                 tree = ET.parse(file_name)
                 root = tree.getroot()
                 reader = (element_to_dict(child) for child in root)  # Assume children of root are records
@@ -1302,18 +2840,46 @@ Example: 'properties:type,country:number'""")
                 file = open(file_name, "r", encoding=args.encoding)
                 sample = file.read(8192)  # Larger sample size
                 file.seek(0)
+                if analyzer.drill_down:
+                    file.close()
+                    file = line_reader = OffsetLineReader(open(file_name, "rb"), args.encoding)
                 try:
                     csv_dialect = csv.Sniffer().sniff(sample, delimiters=[",", ";", "|", "\t"])
                     reader = csv.DictReader(file, dialect=csv_dialect)
                 except csv.Error:
                     # Fallback: try tab delimiter
                     reader = csv.DictReader(file, delimiter="\t")
+                # reading the header here also makes offsets start at the first record
+                analyzer.register_attributes(reader.fieldnames or [])
+
+            record_offset = None
+            if line_reader:
+                analyzer.drill_files.append({
+                    "name": os.path.abspath(file_name),
+                    "type": "csv" if isinstance(reader, csv.DictReader) else "jsonl",
+                    "encoding": args.encoding,
+                    "delimiter": reader.reader.dialect.delimiter if isinstance(reader, csv.DictReader) else None,
+                })
+                record_offset = line_reader.offset
+            elif analyzer.drill_down:
+                print(f"drill-down index not available for {file_type} files")
+            analyzer.current_pointer = None
+
             if args.filter:
                 filter_attr, filter_value = args.filter.split("=")
 
+            compact = isinstance(reader, csv.DictReader)
             for row in reader:
+                if line_reader:
+                    analyzer.current_pointer = (len(analyzer.drill_files) - 1, record_offset)
+                    record_offset = line_reader.offset
                 if args.filter and not analyzer.matches_filter(row, filter_attr, filter_value):
                     continue
+                if compact:
+                    group_cell = row.get(analyzer.group_by_attr) if analyzer.group_by_attr else None
+                    row = compact_row(row)
+                    if group_cell is not None and analyzer.group_by_attr not in row:
+                        row[analyzer.group_by_attr] = group_cell  # still grouped under "" rather than "unknown"
 
                 analyzer.record_count += 1
                 if analyzer.record_count % 10000 == 0:
@@ -1322,11 +2888,49 @@ Example: 'properties:type,country:number'""")
                 # Use the new process_record method that handles grouping
                 analyzer.process_record(row)
 
+                if refresher:
+                    refresher.check()
+                if args.early_stop and drift_monitor and analyzer.record_count % 1000 == 0:
+                    if drift_monitor.check(analyzer):
+                        break
+            if args.early_stop and drift_monitor and drift_monitor.status:
+                print(f"{drift_monitor.status} confirmed, stopped reading early")
+                shut_down = -1
+                break
+
     except KeyboardInterrupt:
-        shut_down = 9
+        shut_down = 0 if args.follow else 9  # Ctrl-C is how following ends
 
-    status = "complete" if shut_down == 0 else "interrupted"
+    status = "complete" if shut_down == 0 else "stopped early" if shut_down == -1 else "interrupted"
     print(f"\n{analyzer.record_count:,} rows read, file {status}\n")
+    if shut_down == -1:
+        shut_down = 0
+
+    if drift_monitor:
+        drift_monitor.check(analyzer)
+        if drift_monitor.findings:
+            print(f"drift detected against {args.baseline}: {len(drift_monitor.findings)} finding(s)\n")
+            save_or_view_report(drift_monitor.generate_report(), args.drift_report, "drift report")
+            if shut_down == 0:
+                shut_down = 3
+        else:
+            print(f"no drift detected against {args.baseline}\n")
+
+    if args.snapshot:
+        save_snapshot(analyzer, args.snapshot)
+    if analyzer.join_signatures is not None:
+        save_or_view_report(analyzer.generate_join_candidates_report(), args.join_candidates, "join candidates report")
+    if args.drill_down:
+        with open(args.drill_down, "w") as file:
+            json.dump(analyzer.generate_drill_down_index(), file)
+        print(f"drill-down index saved to {args.drill_down}\n")
+    if args.patterns is not None:
+        save_or_view_report(analyzer.generate_pattern_report(), args.patterns, "pattern report")
+    if analyzer.key_discovery:
+        try:
+            save_or_view_report(analyzer.generate_key_discovery_report(), args.key_discovery, "key discovery report")
+        finally:
+            analyzer.key_discovery.close()
 
     # If enumeration is requested, only generate enumeration report
     if enumerate_config:
@@ -1345,7 +2949,7 @@ Example: 'properties:type,country:number'""")
                     print("CODE ENUMERATION REPORT")
                     print("="*60)
                     
-                    if prettytable:
+                    if load_prettytable():
                         report_viewer(enum_report)
                     else:
                         # Simple text output for enumeration
@@ -1379,42 +2983,26 @@ Example: 'properties:type,country:number'""")
     else:
         # Generate main schema report
         if args.output_file:
-            # Check if output should be markdown or CSV
-            output_ext = pathlib.Path(args.output_file).suffix.lower()
-            if output_ext == '.md':
-                # Generate markdown format
-                markdown_content = analyzer.generate_markdown_report()
-                with open(args.output_file, "w") as file:
-                    file.write(markdown_content)
-                print(f"markdown schema saved to {args.output_file}\n")
-            else:
-                # Generate CSV format (default)
-                report_rows = analyzer.generate("report")
-                with open(args.output_file, "w") as file:
-                    writer = csv.writer(file)
-                    metadata_rows = [
-                        ["file_name", analyzer.file_name],
-                        ["file_type", analyzer.file_type],
-                        []
-                    ]
-                    writer.writerows(metadata_rows + report_rows)
-                print(f"statistical report saved to {args.output_file}\n")
-        elif prettytable:
+            # Markdown for .md output files, CSV otherwise
+            save_schema_report(analyzer, args.output_file)
+        elif load_prettytable():
             # Display to console
-            report_rows = analyzer.generate("report")
-            report_viewer(report_rows)
+            report_viewer(analyzer.iter_report())
         else:
             # Fallback: simple text output when prettytable is not available
             output_lines = []
             output_lines.append("Statistical Analysis Report:")
             output_lines.append("=" * 100)
-            header = report_rows[0] if report_rows else []
-            if header:
-                output_lines.append(f"{'Attribute':<25} {'Type':<15} {'Count':<8} {'Pct':<8} {'Unique':<8} {'Top Value':<30}")
-                output_lines.append("-" * 100)
-                for row in report_rows[1:]:  # Skip header row
-                    if len(row) >= 7:  # Ensure we have enough columns
-                        output_lines.append(f"{row[0]:<25} {row[1]:<15} {row[2]:<8} {row[3]:<8} {row[4]:<8} {row[6]:<30}")
+            report_rows = analyzer.iter_report()
+            header = next(report_rows)
+            first_col = 1 if analyzer.group_by_attr else 0  # grouped reports start with the group value
+            top_value_col = header.index("top_value1") if "top_value1" in header else None
+            output_lines.append(f"{'Attribute':<25} {'Type':<15} {'Count':<8} {'Pct':<8} {'Unique':<8} {'Top Value':<30}")
+            output_lines.append("-" * 100)
+            for row in report_rows:
+                attr, attr_type, count, pct, unique = row[first_col:first_col + 5]
+                top_value = row[top_value_col] if top_value_col else ""
+                output_lines.append(f"{attr:<25} {attr_type:<15} {count:<8} {pct:<8} {unique:<8} {top_value:<30}")
             output_lines.append("")
             output_lines.append("Note: Install prettytable for better formatted output: pip install prettytable")
             output_lines.append("Or use -o filename.csv to save report to CSV file")
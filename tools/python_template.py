@@ -9,11 +9,20 @@ import sys
 import time
 from datetime import datetime
 
-import numpy as np
-
 # import csv or pandas here
 
 
+def is_array(_val):
+    """numpy arrays only come from pandas (parquet) input, so numpy is never imported just to check"""
+    numpy = sys.modules.get("numpy")
+    return numpy is not None and isinstance(_val, numpy.ndarray)
+
+
+def compact_row(row):
+    """drop empty and whitespace only values so mapping only touches populated columns"""
+    return {k: v for k, v in row.items() if v and not (isinstance(v, str) and v.isspace())}
+
+
 class Mapper:
     """mapper class"""
 
@@ -41,15 +50,15 @@ class Mapper:
         # feature example
         # json_obj.add_feature(
         #     {
-        #         "NAME_LAST": raw_data["last_name"],
-        #         "NAME_FIRST": raw_data["first_name"],
-        #         "NAME_MIDDLE": raw_data["middle_name"],
+        #         "NAME_LAST": raw_data.get("last_name"),
+        #         "NAME_FIRST": raw_data.get("first_name"),
+        #         "NAME_MIDDLE": raw_data.get("middle_name"),
         #     }
         # )
 
         # payload examples
-        # json_obj.add_payload({"job_category": raw_data["job_category"]})
-        # json_obj.add_payload({"job_title": raw_data["job_title"]})
+        # json_obj.add_payload({"job_category": raw_data.get("job_category")})
+        # json_obj.add_payload({"job_title": raw_data.get("job_title")})
 
         json_data = json_obj.render()
         self.capture_mapped_stats(json_data)
@@ -74,7 +83,7 @@ class Mapper:
     def not_empty(self, _val):
         if _val is None:
             return False
-        if isinstance(_val, (dict, list, np.ndarray)):
+        if isinstance(_val, (dict, list)) or is_array(_val):
             return len(_val) > 0
         return len(str(_val)) > 0
 
@@ -167,7 +176,7 @@ class SenzingJson:
     def not_empty(self, _value):
         if _value is None:
             return False
-        if isinstance(_value, (list, dict, np.ndarray)):
+        if isinstance(_value, (list, dict)) or is_array(_value):
             return len(_value) > 0
         return len(str(_value).strip()) > 0
 
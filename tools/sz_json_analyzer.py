@@ -1,17 +1,30 @@
 #! /usr/bin/env python3
 
 import argparse
+import atexit
+import copy
 import csv
+import glob
+import hashlib
+import heapq
 import io
 import json
+import multiprocessing
 import os
+import pickle
 import signal
+import string
 import subprocess
 import sys
+import tempfile
 import time
+from array import array
+from collections import deque, namedtuple
 from contextlib import suppress
 from datetime import datetime
 
+from analyzer_common import BloomFilter, HyperLogLog, OffsetLineReader, ReportRefresher, parse_size, value_hash
+
 try:
     import prettytable
 except (ImportError, ModuleNotFoundError) as err:
@@ -56,50 +69,458 @@ def get_config_data(config_file_name):
     return config_data, config_message
 
 
+# resolved config of an attribute name as mapped, e.g. HOME_ADDR_LINE1 -> ADDR_LINE1 of ADDRESS labeled HOME
+ResolvedAttribute = namedtuple(
+    "ResolvedAttribute", ["attr_name", "attr_code", "ftype_code", "label", "felem_code", "attr_id", "required", "unmapped"]
+)
+
+
+def resolve_attribute(attr_name, attr_data, label=""):
+    return ResolvedAttribute(
+        attr_name,
+        attr_data["ATTR_CODE"],
+        attr_data["FTYPE_CODE"] if attr_data["FTYPE_CODE"] else attr_data["ATTR_CODE"],
+        label,
+        attr_data["FELEM_CODE"],
+        attr_data["ATTR_ID"],
+        attr_data["FELEM_REQ"].upper() in ("YES", "ANY"),
+        False,
+    )
+
+
+# bump when the tables built by compile_config change so older compiled caches are rebuilt
+COMPILED_CONFIG_VERSION = 1
+
+
+def compile_config(config_data):
+    """index the raw CFG_* tables the way the analyzer looks them up"""
+    data_source_lookup = {}
+    for record in config_data["G2_CONFIG"]["CFG_DSRC"]:
+        data_source_lookup[record["DSRC_CODE"]] = record
+
+    feature_lookup = {}
+    for record in config_data["G2_CONFIG"]["CFG_FTYPE"]:
+        feature_lookup[record["FTYPE_CODE"]] = record
+
+    attribute_lookup = {}
+    required_attributes = {}
+    label_to_attribute = {}
+    feature_order = {}
+    for record in config_data["G2_CONFIG"]["CFG_ATTR"]:
+        attribute_lookup[record["ATTR_CODE"]] = record
+        ftype_code = record["FTYPE_CODE"] if record["FTYPE_CODE"] else record["ATTR_CODE"]
+        if ftype_code not in required_attributes:
+            required_attributes[ftype_code] = []
+        if record["FELEM_REQ"] != "No":
+            required_attributes[ftype_code].append(record)
+        if record["FELEM_CODE"] == "USAGE_TYPE":
+            label_to_attribute[ftype_code] = record["ATTR_CODE"]
+        if ftype_code not in feature_order:
+            feature_order[ftype_code] = record["ATTR_ID"]
+        elif feature_order[ftype_code] < record["ATTR_ID"]:
+            feature_order[ftype_code] = record["ATTR_ID"]
+
+    feature_order["RECORD_TYPE"] = 1004  # hack until 4.0 to mover record_type higher
+
+    return {
+        "data_source_lookup": data_source_lookup,
+        "feature_lookup": feature_lookup,
+        "attribute_lookup": attribute_lookup,
+        "required_attributes": required_attributes,
+        "label_to_attribute": label_to_attribute,
+        "feature_order": feature_order,
+        # plain tuples so the compiled file loads whether this runs as a script or is imported
+        "resolved_attributes": {code: tuple(resolve_attribute(code, x)) for code, x in attribute_lookup.items()},
+    }
+
+
+def get_default_config_id():
+    """the default config ID of the Senzing instance, or None when the Senzing SDK is not available"""
+    try:
+        from senzing import G2ConfigMgr
+
+        g2ConfigMgr = G2ConfigMgr()
+        g2ConfigMgr.init("pyG2ConfigMgr", os.getenv("SENZING_ENGINE_CONFIGURATION_JSON"), False)
+        defaultConfigID = bytearray()
+        g2ConfigMgr.getDefaultConfigID(defaultConfigID)
+        g2ConfigMgr.destroy()
+        return defaultConfigID.decode()
+    except Exception:
+        return None
+
+
+def get_config_tables(config_file_name, refresh_config=False):
+    """compiled config tables, cached next to the json config and keyed by its content hash
+
+    Whenever the Senzing SDK can be used its default config ID is checked, and the config is only fetched
+    again when that ID differs from the cached one (or refresh_config is set). Without it the cached json is used.
+    """
+    compiled_file_name = os.path.splitext(config_file_name)[0] + ".pickle"
+    # ignore compiled file IO errors as just for speed
+    compiled = None
+    with suppress(Exception):
+        with open(compiled_file_name, "rb") as f:
+            compiled = pickle.load(f)
+    if not isinstance(compiled, dict) or compiled.get("version") != COMPILED_CONFIG_VERSION:
+        compiled = None
+
+    config_id = get_default_config_id()
+    config_exists = os.path.exists(config_file_name)
+    if config_id and config_exists and compiled and compiled.get("config_id") == config_id and not refresh_config:
+        return compiled["tables"], f"Using current configuration data (config ID {config_id})"
+
+    if config_id or refresh_config or not config_exists:
+        config_data, config_message = get_config_data(config_file_name)
+        if not config_data:
+            return None, config_message
+        config_source = json.dumps(config_data, indent=4).encode("utf-8")
+        if config_message != "Using current configuration data":
+            config_id = None  # fell back to the cached json
+    else:
+        config_data = None
+        config_message = "Using previously cached configuration data (Senzing SDK not available)"
+        with open(config_file_name, "rb") as f:
+            config_source = f.read()
+    source_hash = hashlib.sha256(config_source).hexdigest()
+
+    if compiled and compiled["source_hash"] == source_hash:
+        config_tables = compiled["tables"]
+    else:
+        config_tables = compile_config(config_data or json.loads(config_source))
+    with suppress(Exception):
+        compiled = {
+            "version": COMPILED_CONFIG_VERSION,
+            "source_hash": source_hash,
+            "config_id": config_id,
+            "tables": config_tables,
+        }
+        with open(compiled_file_name, "wb") as f:
+            pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return config_tables, config_message
+
+
+class FeatureShape:
+    """attribute order, description positions and messages shared by every feature with the same attributes"""
+
+    __slots__ = ("order", "attr_codes", "desc_positions", "label_attribute", "populated_attr_list", "messages", "complete")
+
+
+def record_key_hash(data_source, record_id):
+    """hash of a record's key and its data source, or 0 and None when it has no usable key"""
+    if data_source and record_id and isinstance(data_source, str):
+        data_source = data_source.upper()
+        return value_hash(f"{data_source}|{record_id}"), data_source
+    return 0, None
+
+
+class DuplicateKeyCheck:
+    """finds RECORD_IDs used more than once within a DATA_SOURCE in bounded memory
+
+    The key hash of every row is spilled to disk in row order along with its data source and
+    where the record is. A bloom filter, grown in layers as rows come in, picks out the hashes
+    that may have been seen before and only those are kept in memory. A scan of the spilled
+    hashes at the end confirms which of them really repeat, and on which rows.
+    """
+
+    max_samples = 99  # duplicate row pairs kept per data source
+
+    def __init__(self, temp_dir=None):
+        self.blooms = [BloomFilter(1 << 20, 0.01)]
+        self.suspects = set()
+        self.data_source_ids = {}
+        self.data_sources = [None]  # id 0 is for rows without a data source or record_id
+        self.spill = tempfile.NamedTemporaryFile(prefix="sz_keys_", dir=temp_dir, delete=False)
+        self.buffer = array("Q")
+
+    def data_source_id(self, data_source):
+        if data_source not in self.data_source_ids:
+            self.data_source_ids[data_source] = len(self.data_sources)
+            self.data_sources.append(data_source)
+        return self.data_source_ids[data_source]
+
+    def add(self, data_source, record_id, file_index, offset):
+        """add the next row, in row order"""
+        hashed, data_source = record_key_hash(data_source, record_id)
+        self.add_hash(hashed, self.data_source_id(data_source) if hashed else 0, file_index, offset)
+
+    def add_hash(self, hashed, data_source_id, file_index, offset):
+        if hashed:
+            if hashed in self.suspects or any(hashed in bloom for bloom in self.blooms):
+                self.suspects.add(hashed)
+            else:
+                bloom = self.blooms[-1]
+                if bloom.count >= bloom.capacity:
+                    # each layer holds 4x more at half the error rate, so the overall rate stays under 2%
+                    bloom = BloomFilter(bloom.capacity * 4, 0.01 / 2 ** len(self.blooms))
+                    self.blooms.append(bloom)
+                bloom.add(hashed)
+        self.buffer.extend((hashed, data_source_id, file_index << 40 | offset))
+        if len(self.buffer) >= 3 << 16:
+            self.buffer.tofile(self.spill)
+            del self.buffer[:]
+
+    def find_duplicates(self):
+        """scan the spilled hashes for the suspects, returning stats and sample row pairs per data source"""
+        self.buffer.tofile(self.spill)
+        del self.buffer[:]
+        self.spill.flush()
+
+        first_seen = {}
+        duplicates = {}
+        row_num = 0
+        suspects = self.suspects
+        with open(self.spill.name, "rb") as f:
+            while True:
+                chunk = array("Q")
+                try:
+                    chunk.fromfile(f, 3 << 20)
+                except EOFError:
+                    pass  # partial final chunk
+                if not chunk:
+                    break
+                for i in range(0, len(chunk), 3):
+                    row_num += 1
+                    if chunk[i] not in suspects:
+                        continue
+                    seen = first_seen.get(chunk[i])
+                    if not seen:
+                        first_seen[chunk[i]] = [row_num, chunk[i + 2], 0]
+                        continue
+                    data_source = self.data_sources[chunk[i + 1]]
+                    if data_source not in duplicates:
+                        duplicates[data_source] = {"records": 0, "record_ids": 0, "samples": []}
+                    stats = duplicates[data_source]
+                    stats["records"] += 1
+                    seen[2] += 1
+                    if seen[2] == 1:
+                        stats["record_ids"] += 1
+                    if len(stats["samples"]) < self.max_samples:
+                        stats["samples"].append((seen[0], row_num, seen[1]))
+        return duplicates
+
+    def close(self):
+        if not self.spill.closed:
+            self.spill.close()
+        if os.path.exists(self.spill.name):
+            os.remove(self.spill.name)
+
+
+# rough bytes held per distinct value in an exact value table besides the string itself
+VALUE_OVERHEAD = 100
+
+# rough bytes held per top value of a ValueSketch besides the string itself
+SKETCH_ENTRY_OVERHEAD = 2 * VALUE_OVERHEAD
+
+
+class ValueMemory:
+    """bytes of exact values held against the memory budget, shared by an analyzer and its per data source analyzers"""
+
+    def __init__(self, analyzer):
+        self.used = 0
+        self.analyzers = [analyzer]
+
+# the data source breakdown key of records without a DATA_SOURCE
+NO_DATA_SOURCE = "(none)"
+
+
+def data_source_key(data_source):
+    return data_source.upper() if isinstance(data_source, str) and data_source else NO_DATA_SOURCE
+
+
+class ValueSketch:
+    """estimated unique count and most frequent values of an attribute once its exact values no longer fit
+
+    The top values are a space-saving table: a value that replaces the least frequent one inherits its count as an
+    overcount, so count - overcount is a guaranteed lower bound of how often it was seen.
+    """
+
+    min_top_values = 100
+
+    def __init__(self, values=None, max_top_values=None):
+        self.max_top_values = max_top_values or self.min_top_values
+        self.hll = HyperLogLog()
+        self.top = {}  # value -> [count, overcount]
+        self.evicted = False  # once values were dropped, any value missing from top may have been seen min_count times
+        if values:
+            for value in values:
+                self.hll.add(value_hash(value))
+            top_values = heapq.nlargest(self.max_top_values, values.items(), key=lambda x: x[1])
+            self.top = {value: [count, 0] for value, count in top_values}
+            self.evicted = len(values) > self.max_top_values
+        self.build_heap()
+
+    def build_heap(self):
+        # (count, value) of every top value, counts only being brought up to date when they reach the top
+        self.heap = [(entry[0], value) for value, entry in self.top.items()]
+        heapq.heapify(self.heap)
+
+    def add(self, value):
+        self.hll.add(value_hash(value))
+        top = self.top
+        if value in top:
+            top[value][0] += 1
+        elif len(top) < self.max_top_values:
+            top[value] = [1, 0]
+            heapq.heappush(self.heap, (1, value))
+        else:
+            heap = self.heap
+            while heap[0][0] != top[heap[0][1]][0]:
+                heapq.heapreplace(heap, (top[heap[0][1]][0], heap[0][1]))
+            min_count, min_value = heap[0]
+            del top[min_value]
+            top[value] = [min_count + 1, min_count]
+            heapq.heapreplace(heap, (min_count + 1, value))
+            self.evicted = True
+
+    def min_count(self):
+        """the most times a value missing from the top values can have been seen"""
+        return min(entry[0] for entry in self.top.values()) if self.evicted else 0
+
+    def merge(self, other):
+        self.hll.merge(other.hll)
+        self.max_top_values = max(self.max_top_values, other.max_top_values)
+        # a value missing from one table may have been seen up to that table's min_count times there
+        own_min_count, other_min_count = self.min_count(), other.min_count()
+        for value, entry in self.top.items():
+            if value not in other.top:
+                entry[0] += other_min_count
+                entry[1] += other_min_count
+        for value, (count, overcount) in other.top.items():
+            if value in self.top:
+                self.top[value][0] += count
+                self.top[value][1] += overcount
+            else:
+                self.top[value] = [count + own_min_count, overcount + own_min_count]
+        self.evicted = self.evicted or other.evicted
+        if len(self.top) > self.max_top_values:
+            self.top = dict(heapq.nlargest(self.max_top_values, self.top.items(), key=lambda x: x[1][0]))
+            self.evicted = True
+        self.build_heap()
+
+    def counts(self):
+        """the guaranteed lower bound of how often each top value was seen"""
+        return {value: count - overcount for value, (count, overcount) in self.top.items()}
+
+
+class MinHashSketch:
+    """bottom-k MinHash of a set of values: its k smallest value hashes, so exact until it has k values
+
+    The k smallest hashes of two sketches together are a sketch of the union of their sets, and the share of
+    those found in both sketches estimates the share of the union the two sets have in common.
+    """
+
+    size = 512
+
+    def __init__(self):
+        self.heap = []  # negated so the largest hash kept is on top
+        self.hashes = set()
+
+    def add(self, value_hash):
+        heap = self.heap
+        if len(heap) == self.size and value_hash >= -heap[0] or value_hash in self.hashes:
+            return
+        if len(heap) < self.size:
+            heapq.heappush(heap, -value_hash)
+        else:
+            self.hashes.discard(-heapq.heapreplace(heap, -value_hash))
+        self.hashes.add(value_hash)
+
+    def merge(self, other):
+        for value_hash in other.hashes:
+            self.add(value_hash)
+
+    def count(self):
+        """estimated number of distinct values"""
+        if len(self.heap) < self.size:
+            return len(self.heap)
+        return round((self.size - 1) * (1 << 64) / -self.heap[0])
+
+    def overlap(self, other):
+        """estimated number of distinct values the two sketches have in common"""
+        union = heapq.nsmallest(self.size, self.hashes | other.hashes)
+        shared = sum(1 for x in union if x in self.hashes and x in other.hashes)
+        if len(union) < self.size:
+            return shared
+        return round(shared / self.size * (self.size - 1) * (1 << 64) / union[-1])
+
+
+PUNCTUATION_TO_SPACE = str.maketrans(string.punctuation, " " * len(string.punctuation))
+
+
+def overlap_value(value):
+    """the form of a feature value compared across data sources, ignoring case, punctuation and spacing"""
+    return " ".join(value.upper().translate(PUNCTUATION_TO_SPACE).split())
+
+
+# population and uniqueness warnings are only added by get_report, for the whole file
+REPORT_WARNING = {"count": 1, "rows": ["n/a"]}
+
+# records sharing one value of a candidate feature, by FTYPE_FREQ, beyond which the value is
+# likely to be treated as generic and makes for expensive candidate lists (roughly Senzing's defaults)
+GENERIC_VALUE_THRESHOLDS = {"A1": 10, "F1": 10, "FF": 50, "FM": 500, "NAME": 1000}
+
+
+class FlatRowPlan:
+    """features, unmapped columns and record messages shared by every flat row with the same populated columns"""
+
+    __slots__ = ("features", "unmapped", "messages")
+
+
 # =========================
 class SzJsonAnalyzer:
 
-    def __init__(self, config_data):
+    def __init__(self, config_tables):
+        """config_tables as returned by compile_config, or the raw config data to compile"""
 
-        self.record_count = 0
-
-        self.data_source_lookup = {}
-        for record in config_data["G2_CONFIG"]["CFG_DSRC"]:
-            self.data_source_lookup[record["DSRC_CODE"]] = record
-
-        self.feature_lookup = {}
-        for record in config_data["G2_CONFIG"]["CFG_FTYPE"]:
-            self.feature_lookup[record["FTYPE_CODE"]] = record
-
-        self.attribute_lookup = {}
-        self.required_attributes = {}
-        self.label_to_attribute = {}
-        self.feature_order = {}
-        for record in config_data["G2_CONFIG"]["CFG_ATTR"]:
-            self.attribute_lookup[record["ATTR_CODE"]] = record
-            ftype_code = record["FTYPE_CODE"] if record["FTYPE_CODE"] else record["ATTR_CODE"]
-            if ftype_code not in self.required_attributes:
-                self.required_attributes[ftype_code] = []
-            if record["FELEM_REQ"] != "No":
-                self.required_attributes[ftype_code].append(record)
-            if record["FELEM_CODE"] == "USAGE_TYPE":
-                self.label_to_attribute[ftype_code] = record["ATTR_CODE"]
-            if ftype_code not in self.feature_order:
-                self.feature_order[ftype_code] = record["ATTR_ID"]
-            elif self.feature_order[ftype_code] < record["ATTR_ID"]:
-                self.feature_order[ftype_code] = record["ATTR_ID"]
-
-        self.feature_order["RECORD_TYPE"] = 1004  # hack until 4.0 to mover record_type higher
+        if "G2_CONFIG" in config_tables:
+            config_tables = compile_config(config_tables)
+        self.data_source_lookup = config_tables["data_source_lookup"]
+        self.feature_lookup = config_tables["feature_lookup"]
+        self.attribute_lookup = config_tables["attribute_lookup"]
+        self.required_attributes = config_tables["required_attributes"]
+        self.label_to_attribute = config_tables["label_to_attribute"]
+        self.feature_order = config_tables["feature_order"]
 
         self.max_values_per_attr = 1000000
-        self.mapped_attribute = {}
+        self.max_rows_per_message = 99
+        self.memory_budget = None  # bytes of exact values to keep before the largest are sketched
+        self.mapped_attribute = {k: ResolvedAttribute._make(v) for k, v in config_tables["resolved_attributes"].items()}
+        self.feature_shapes = {}
+        self.max_flat_plans = 100000
+        self.source_analyzers = None  # data source -> analyzer of its records, when broken down by data source
+        self.overlap_sketches = None  # (data source, feature) -> MinHashSketch of its candidate feature values
+        self.overlap_features = {k for k, v in self.feature_lookup.items() if v["USED_FOR_CAND"] == "Yes"}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.record_count = 0
+        self.value_memory = ValueMemory(self)
         self.attribute_stats = {}
         self.unmapped_stats = {}
         self.feature_stats = {}
         self.message_stats = {"ERROR": {}, "WARNING": {}, "INFO": {}}
+        self.error_record_count = 0
+        self.load_error_record_count = 0  # records with errors other than a DATA_SOURCE missing from the config
+
+    def source_analyzer(self, data_source):
+        """the analyzer of one data source's records, sharing this one's config, attribute descriptors and caches"""
+        data_source = data_source_key(data_source)
+        source_analyzer = self.source_analyzers.get(data_source)
+        if not source_analyzer:
+            source_analyzer = copy.copy(self)
+            source_analyzer.source_analyzers = None
+            source_analyzer.overlap_sketches = None
+            source_analyzer.reset_stats()
+            # one --max_memory budget covers the combined stats and every data source's
+            source_analyzer.value_memory = self.value_memory
+            self.value_memory.analyzers.append(source_analyzer)
+            self.source_analyzers[data_source] = source_analyzer
+        return source_analyzer
 
     def register_attribute(self, attr_name):
+        """resolve an attribute name, which may have a label prefix or suffix, once and remember it"""
         attr_data = {}
+        label = ""
         if attr_name in self.attribute_lookup:
             attr_data = self.attribute_lookup[attr_name]
         elif "_" in attr_name:
@@ -107,88 +528,261 @@ class SzJsonAnalyzer:
             possible_attr_name = attr_name[attr_name.find("_") + 1 :]
             if possible_attr_name in self.attribute_lookup:
                 attr_data = self.attribute_lookup[possible_attr_name]
-                attr_data["LABEL"] = possible_label
+                label = possible_label
             else:
                 possible_label = attr_name[attr_name.rfind("_") + 1 :]
                 possible_attr_name = attr_name[0 : attr_name.rfind("_")]
                 if possible_attr_name in self.attribute_lookup:
                     attr_data = self.attribute_lookup[possible_attr_name]
-                    attr_data["LABEL"] = possible_label
+                    label = possible_label
         if attr_data:
-            self.mapped_attribute[attr_name] = attr_data
+            resolved = resolve_attribute(attr_name, attr_data, label)
         else:
-            self.mapped_attribute[attr_name] = {"ATTR_NAME": attr_name, "UNMAPPED": True}
+            resolved = ResolvedAttribute(attr_name, None, None, "", None, None, False, True)
+        self.mapped_attribute[attr_name] = resolved
+        return resolved
 
     def add_to_features(self, features, errors, parent, attr_name, attr_value):
         if isinstance(attr_value, (list, dict)):
             errors.append(f"Expected integer or string for {attr_name}")
         else:
-            attr_data = self.mapped_attribute[attr_name].copy()
-            attr_data["ATTR_VALUE"] = attr_value
-            feature_key = f"{parent}|{attr_data['FTYPE_CODE'] if attr_data['FTYPE_CODE'] else attr_data['ATTR_CODE']}|{attr_data.get('LABEL', '')}"
+            attr = self.mapped_attribute[attr_name]
+            feature_key = (parent, attr.ftype_code, attr.label)
             if feature_key not in features:
-                features[feature_key] = [attr_data]
+                features[feature_key] = ([attr], [attr_value])
             else:
-                features[feature_key].append(attr_data)
+                features[feature_key][0].append(attr)
+                features[feature_key][1].append(attr_value)
+
+    def get_feature_shape(self, feature, attrs, labeled):
+        """work out once per combination of attributes how a feature is ordered, described and checked"""
+        shape_key = (feature, labeled, tuple(attr.attr_name for attr in attrs))
+        shape = self.feature_shapes.get(shape_key)
+        if shape:
+            return shape
+
+        shape = FeatureShape()
+        shape.order = sorted(range(len(attrs)), key=lambda i: attrs[i].attr_id)
+        shape.attr_codes = [attrs[i].attr_code for i in shape.order]
+        shape.desc_positions = [
+            i for i in shape.order if attrs[i].felem_code not in ("USAGE_TYPE", "USED_FROM_DT", "USED_THRU_DT")
+        ]
+        shape.complete = any(attr.required for attr in attrs)
+        populated_attr_list = list(shape.attr_codes)
+
+        shape.label_attribute = None
+        if labeled and feature in self.label_to_attribute and self.label_to_attribute[feature] not in populated_attr_list:
+            shape.label_attribute = self.label_to_attribute[feature]
+            populated_attr_list.append(shape.label_attribute)
+
+        messages = []
+        if (
+            feature == "NAME"
+            and "NAME_FULL" in populated_attr_list
+            and any(x in populated_attr_list for x in ["NAME_ORG", "NAME_LAST", "NAME_FIRST"])
+        ):
+            messages.append(["INFO", f"Only NAME_FULL should be mapped"])
+        if (
+            feature == "ADDRESS"
+            and "ADDR_FULL" in populated_attr_list
+            and any(x in populated_attr_list for x in ["ADDR_LINE1", "ADDR_CITY", "ADDR_STATE", "ADDR_POSTAL_CODE"])
+        ):
+            messages.append(["INFO", f"Only ADDR_FULL should be mapped"])
+        if feature == "ADDRESS" and "ADDR_FULL" not in populated_attr_list and "ADDR_LINE1" not in populated_attr_list:
+            messages.append(["INFO", f"Incomplete ADDRESS (no ADDR_LINE1)"])
+
+        if feature in self.required_attributes:  # wont be for datasource, record_id
+            for record in self.required_attributes[feature]:
+                if record["ATTR_CODE"] not in populated_attr_list:
+                    if record["FELEM_REQ"] == "Yes":
+                        messages.append(["INFO", f"{record['ATTR_CODE']} required for complete {feature}"])
+                        shape.complete = False
+                    elif record["FELEM_REQ"] == "Desired":
+                        messages.append(["INFO", f"{record['ATTR_CODE']} desired"])
+
+        shape.populated_attr_list = populated_attr_list
+        shape.messages = messages
+        self.feature_shapes[shape_key] = shape
+        return shape
 
     def update_feature_stats(self, feature, attribute, value):
-        if attribute in self.feature_stats[feature]["attributes"]:
-            self.feature_stats[feature]["attributes"][attribute]["count"] += 1
+        attributes = self.feature_stats[feature]["attributes"]
+        attr_stats = attributes.get(attribute)
+        if attr_stats:
+            attr_stats["count"] += 1
         else:
             order = self.attribute_lookup[attribute]["ATTR_ID"]
             # order = 1004 if attribute == 'RECORD_TYPE' else order # until moved in 4.0
             # print(order, attribute)
-            self.feature_stats[feature]["attributes"][attribute] = {"order": order, "count": 1, "values": {}}
-        if value in self.feature_stats[feature]["attributes"][attribute]["values"]:
-            self.feature_stats[feature]["attributes"][attribute]["values"][value] += 1
-        elif len(self.feature_stats[feature]["attributes"][attribute]["values"]) < self.max_values_per_attr:
-            self.feature_stats[feature]["attributes"][attribute]["values"][value] = 1
+            attr_stats = attributes[attribute] = {"order": order, "count": 1, "values": {}}
+        self.count_value(attr_stats, value, self.max_values_per_attr)
 
     def update_unmapped_stats(self, attr_name, attr_value):
         if attr_name in self.unmapped_stats:
             self.unmapped_stats[attr_name]["count"] += 1
         else:
             self.unmapped_stats[attr_name] = {"count": 1, "values": {}}
-        if attr_value in self.unmapped_stats[attr_name]["values"]:
-            self.unmapped_stats[attr_name]["values"][attr_value] += 1
-        elif len(self.unmapped_stats[attr_name]["values"].keys()) < self.max_values_per_attr:
-            self.unmapped_stats[attr_name]["values"][attr_value] = 1
+        self.count_value(self.unmapped_stats[attr_name], attr_value, self.max_values_per_attr)
+
+    def count_value(self, stats, value, limit=None):
+        values = stats["values"]
+        if type(values) is dict and value in values:
+            values[value] += 1
+        elif type(values) is ValueSketch:
+            values.add(value)
+        elif limit is None or len(values) < limit:
+            values[value] = 1
+            if self.memory_budget:
+                self.value_memory.used += len(value) + VALUE_OVERHEAD
+                if self.value_memory.used > self.memory_budget:
+                    self.sketch_largest_values()
+
+    def value_tables(self):
+        """every stats entry with a values table"""
+        for feature_stats in self.feature_stats.values():
+            yield feature_stats
+            yield from feature_stats["attributes"].values()
+        yield from self.unmapped_stats.values()
+
+    def sketch_largest_values(self):
+        """replace the largest exact value tables sharing the memory budget with sketches until half of it is free"""
+        value_memory = self.value_memory
+        exact_tables = [
+            x for analyzer in value_memory.analyzers for x in analyzer.value_tables() if type(x["values"]) is dict
+        ]
+        for stats in sorted(exact_tables, key=lambda x: len(x["values"]), reverse=True):
+            if value_memory.used <= self.memory_budget // 2:
+                break
+            value_memory.used -= sum(len(x) + VALUE_OVERHEAD for x in stats["values"])
+            stats["values"] = self.value_sketch(stats["values"])
+
+    def value_sketch(self, values=None):
+        """a sketch whose top values table takes 1/32 of the memory budget, so 16 fit in the half sketching frees"""
+        top_values = self.memory_budget // (32 * SKETCH_ENTRY_OVERHEAD) if self.memory_budget else 0
+        return ValueSketch(values, max(ValueSketch.min_top_values, top_values))
+
+    def unique_count(self, stats):
+        values = stats["values"]
+        if type(values) is ValueSketch:
+            return min(values.hll.estimate(), stats["count"])
+        return len(values)
+
+    def top_values(self, stats, limit):
+        values = stats["values"]
+        counts = values.counts() if type(values) is ValueSketch else values
+        return sorted(counts.items(), key=lambda x: x[1], reverse=True)[:limit]
 
     def update_message_stats(self, cat, stat, row_num="n/a"):
-        row_num = f"row {row_num}" if isinstance(row_num, int) else row_num
         if stat not in self.message_stats[cat]:
             self.message_stats[cat][stat] = {"count": 1, "rows": [row_num]}
         else:
             self.message_stats[cat][stat]["count"] += 1
-            if self.message_stats[cat][stat]["count"] < 100:
+            if len(self.message_stats[cat][stat]["rows"]) < self.max_rows_per_message:
                 self.message_stats[cat][stat]["rows"].append(row_num)
 
+    def stats_state(self):
+        """the statistics another analyzer needs to merge, e.g. from a worker process"""
+        return {
+            "record_count": self.record_count,
+            "error_record_count": self.error_record_count,
+            "load_error_record_count": self.load_error_record_count,
+            "feature_stats": self.feature_stats,
+            "unmapped_stats": self.unmapped_stats,
+            "message_stats": self.message_stats,
+            "source_states": {k: v.stats_state() for k, v in (self.source_analyzers or {}).items()},
+            "overlap_sketches": self.overlap_sketches,
+        }
+
+    def merge_values(self, stats, new_stats, limit=None):
+        values, new_values = stats["values"], new_stats["values"]
+        if type(values) is dict and type(new_values) is ValueSketch:
+            self.value_memory.used -= sum(len(x) + VALUE_OVERHEAD for x in values)
+            values = stats["values"] = self.value_sketch(values)
+        if type(values) is ValueSketch:
+            values.merge(new_values if type(new_values) is ValueSketch else self.value_sketch(new_values))
+            return
+        for value, count in new_values.items():
+            if value in values:
+                values[value] += count
+            elif limit is None or len(values) < limit:
+                values[value] = count
+                if self.memory_budget:
+                    self.value_memory.used += len(value) + VALUE_OVERHEAD
+
+    def merge_stats(self, state, row_offset=0):
+        """merge the stats of a later part of the input, whose row numbers start after row_offset"""
+        self.record_count += state["record_count"]
+        self.error_record_count += state["error_record_count"]
+        self.load_error_record_count += state["load_error_record_count"]
+
+        for feature, new_stats in state["feature_stats"].items():
+            if feature not in self.feature_stats:
+                self.feature_stats[feature] = {"order": new_stats["order"], "count": 0, "values": {}, "attributes": {}}
+            feature_stats = self.feature_stats[feature]
+            feature_stats["count"] += new_stats["count"]
+            self.merge_values(feature_stats, new_stats)
+            for attribute, new_attr_stats in new_stats["attributes"].items():
+                if attribute not in feature_stats["attributes"]:
+                    feature_stats["attributes"][attribute] = {"order": new_attr_stats["order"], "count": 0, "values": {}}
+                attr_stats = feature_stats["attributes"][attribute]
+                attr_stats["count"] += new_attr_stats["count"]
+                self.merge_values(attr_stats, new_attr_stats, self.max_values_per_attr)
+
+        for attr_name, new_stats in state["unmapped_stats"].items():
+            if attr_name not in self.unmapped_stats:
+                self.unmapped_stats[attr_name] = {"count": 0, "values": {}}
+            self.unmapped_stats[attr_name]["count"] += new_stats["count"]
+            self.merge_values(self.unmapped_stats[attr_name], new_stats, self.max_values_per_attr)
+
+        for cat, messages in state["message_stats"].items():
+            for stat, new_stats in messages.items():
+                if stat not in self.message_stats[cat]:
+                    self.message_stats[cat][stat] = {"count": 0, "rows": []}
+                message_stats = self.message_stats[cat][stat]
+                message_stats["count"] += new_stats["count"]
+                for row_num in new_stats["rows"][: self.max_rows_per_message - len(message_stats["rows"])]:
+                    message_stats["rows"].append(row_num + row_offset if isinstance(row_num, int) else row_num)
+
+        for data_source, source_state in state.get("source_states", {}).items():
+            self.source_analyzer(data_source).merge_stats(source_state, row_offset)
+
+        for key, sketch in (state.get("overlap_sketches") or {}).items():
+            if key in self.overlap_sketches:
+                self.overlap_sketches[key].merge(sketch)
+            else:
+                self.overlap_sketches[key] = sketch
+
+        if self.memory_budget and self.value_memory.used > self.memory_budget:
+            self.sketch_largest_values()
+
     def analyze_json(self, input_data, input_row_num=None):
+        """analyze a json record, returning its messages"""
         self.record_count += 1
 
         # print('-'*50)
         # print(json.dumps(input_data, indent=4))
         message_list = []
         features = {}
+        unmapped = []
         for attr_name in input_data.keys():
             if not input_data[attr_name]:
                 continue
-            self.register_attribute(attr_name)
+            attr = self.mapped_attribute.get(attr_name) or self.register_attribute(attr_name)
             attr_value = str(input_data[attr_name])
 
             # its certainly a feature attribute
-            if not self.mapped_attribute[attr_name].get("UNMAPPED"):
+            if not attr.unmapped:
                 self.add_to_features(features, message_list, "ROOT", attr_name, attr_value)
                 continue
 
             # its a certainly an unmapped attribute because its not a list
             if not isinstance(input_data[attr_name], list):
-                self.update_unmapped_stats(attr_name, str(attr_value))
+                unmapped.append((attr_name, attr_value))
                 continue
 
             # its certainly unmapped if its not a list of dictionaries
             if not isinstance(input_data[attr_name][0], dict):
-                self.update_unmapped_stats(attr_name, str(attr_value))
+                unmapped.append((attr_name, attr_value))
                 continue
 
             # hopefully its a sub-list of features
@@ -200,108 +794,178 @@ class SzJsonAnalyzer:
                 for child_attr_name in child_data.keys():
                     if not child_data[child_attr_name]:
                         continue
-                    self.register_attribute(child_attr_name)
+                    child_attr = self.mapped_attribute.get(child_attr_name) or self.register_attribute(child_attr_name)
                     child_value = str(child_data[child_attr_name])
 
-                    if not self.mapped_attribute[child_attr_name].get("UNMAPPED"):
+                    if not child_attr.unmapped:
                         any_features = True
                         self.add_to_features(
                             features, message_list, f"{attr_name}[{child_instance}]", child_attr_name, child_value
                         )
                     else:
-                        unmapped_attributes.append([f"{attr_name}->{child_attr_name}", child_value])
+                        unmapped_attributes.append((f"{attr_name}->{child_attr_name}", child_value))
 
             # if no features, the whole list is unmapped
             if not any_features:
-                self.update_unmapped_stats(attr_name, attr_value)
+                unmapped.append((attr_name, attr_value))
             else:
-                for unmapped_attribute in unmapped_attributes:
-                    self.update_unmapped_stats(unmapped_attribute[0], str(unmapped_attribute[1]))
+                unmapped.extend(unmapped_attributes)
 
         #        print(json.dumps(features, indent=4))
 
-        features_mapped = []
-        attributes_mapped = []
-        for feature_key in features:
-            parent, feature, label = feature_key.split("|")
-            if feature in self.feature_stats:
-                self.feature_stats[feature]["count"] += 1
+        return self.analyze_features(
+            features, unmapped, message_list, input_data.get("DATA_SOURCE"), "RECORD_ID" in input_data, input_row_num
+        )
+
+    def resolve_header(self, header):
+        """resolve the columns of a flat file once so analyze_flat has no per row lookups"""
+        self.flat_columns = [self.mapped_attribute.get(x) or self.register_attribute(x) for x in header]
+        self.flat_data_source_column = header.index("DATA_SOURCE") if "DATA_SOURCE" in header else None
+        self.flat_has_record_id = "RECORD_ID" in header
+        self.flat_record_id_column = header.index("RECORD_ID") if "RECORD_ID" in header else None
+        self.flat_plans = {}
+
+    def record_key(self, input_row):
+        """the DATA_SOURCE and RECORD_ID of a json record or flat row"""
+        if isinstance(input_row, dict):
+            return input_row.get("DATA_SOURCE"), input_row.get("RECORD_ID")
+        key = []
+        for column in (self.flat_data_source_column, self.flat_record_id_column):
+            key.append(input_row[column] if column is not None and column < len(input_row) else None)
+        return tuple(key)
+
+    def plan_flat_row(self, populated):
+        """group the populated columns of a flat row into features and work out the record messages"""
+        features = {}
+        plan = FlatRowPlan()
+        plan.unmapped = []
+        for column in populated:
+            attr = self.flat_columns[column]
+            if attr.unmapped:
+                plan.unmapped.append(column)
+            elif (attr.ftype_code, attr.label) not in features:
+                features[(attr.ftype_code, attr.label)] = ([attr], [column])
             else:
-                order = self.feature_order[feature]
-                # if feature in self.feature_lookup:
-                #    order = 200000 + self.feature_lookup[feature]['FTYPE_ID']
-                # elif feature in self.attribute_lookup:
-                #    order = 100000 + self.attribute_lookup[feature]['ATTR_ID']
-                # else:
-                #    order = -1
-                self.feature_stats[feature] = {"order": order, "count": 1, "values": {}, "attributes": {}}
-
-            possible_complete_feature = False
-            populated_attr_list = []
-            populated_attr_values = []
-            for attribute_data in sorted(features[feature_key], key=lambda k: k["ATTR_ID"]):
-                attribute = attribute_data["ATTR_CODE"]
-                value = attribute_data["ATTR_VALUE"]
-                if attribute_data["FELEM_CODE"] not in ("USAGE_TYPE", "USED_FROM_DT", "USED_THRU_DT"):
-                    populated_attr_values.append(value)
-                self.update_feature_stats(feature, attribute, value)
-                populated_attr_list.append(attribute)
-                if self.attribute_lookup[attribute]["FELEM_REQ"].upper() in ("YES", "ANY"):
-                    possible_complete_feature = True
+                features[(attr.ftype_code, attr.label)][0].append(attr)
+                features[(attr.ftype_code, attr.label)][1].append(column)
 
-            if (
-                label
-                and feature in self.label_to_attribute
-                and self.label_to_attribute[feature] not in populated_attr_list
-            ):
-                self.update_feature_stats(feature, self.label_to_attribute[feature], label)
-                populated_attr_list.append(self.label_to_attribute[feature])
+        plan.features = []
+        plan.messages = []
+        features_mapped = []
+        attributes_mapped = []
+        for (feature, label), (attrs, columns) in features.items():
+            shape = self.get_feature_shape(feature, attrs, bool(label))
+            plan.features.append((feature, label, shape, columns))
+            attributes_mapped.extend(shape.populated_attr_list)
+            plan.messages.extend(shape.messages)
+            if shape.complete:
+                features_mapped.append(feature)
+        plan.messages.extend(self.record_messages(features_mapped, attributes_mapped, self.flat_has_record_id))
 
-            if populated_attr_values:  # capture the full feature
-                feature_desc = " ".join(populated_attr_values)
-                if feature_desc not in self.feature_stats[feature]["values"]:
-                    self.feature_stats[feature]["values"][feature_desc] = 1
-                else:
-                    self.feature_stats[feature]["values"][feature_desc] += 1
+        if len(self.flat_plans) < self.max_flat_plans:
+            self.flat_plans[populated] = plan
+        return plan
 
-            attributes_mapped.extend(populated_attr_list)
+    def analyze_flat(self, row, input_row_num=None):
+        """analyze a row of a flat file (e.g. csv) whose header was given to resolve_header, returning its messages"""
+        self.record_count += 1
 
-            if (
-                feature == "NAME"
-                and "NAME_FULL" in populated_attr_list
-                and any(x in populated_attr_list for x in ["NAME_ORG", "NAME_LAST", "NAME_FIRST"])
-            ):
-                message_list.append(["INFO", f"Only NAME_FULL should be mapped"])
-            if (
-                feature == "ADDRESS"
-                and "ADDR_FULL" in populated_attr_list
-                and any(x in populated_attr_list for x in ["ADDR_LINE1", "ADDR_CITY", "ADDR_STATE", "ADDR_POSTAL_CODE"])
-            ):
-                message_list.append(["INFO", f"Only ADDR_FULL should be mapped"])
-            if (
-                feature == "ADDRESS"
-                and "ADDR_FULL" not in populated_attr_list
-                and "ADDR_LINE1" not in populated_attr_list
-            ):
-                message_list.append(["INFO", f"Incomplete ADDRESS (no ADDR_LINE1)"])
-
-            if feature in self.required_attributes:  # wont be for datasource, record_id
-                for record in self.required_attributes[feature]:
-                    if record["ATTR_CODE"] not in populated_attr_list:
-                        if record["FELEM_REQ"] == "Yes":
-                            message_list.append(["INFO", f"{record['ATTR_CODE']} required for complete {feature}"])
-                            possible_complete_feature = False
-                        elif record["FELEM_REQ"] == "Desired":
-                            message_list.append(["INFO", f"{record['ATTR_CODE']} desired"])
-
-            if possible_complete_feature:
+        populated = tuple([i for i, value in enumerate(row[: len(self.flat_columns)]) if value])
+        plan = self.flat_plans.get(populated) or self.plan_flat_row(populated)
+        data_source = None
+        if self.flat_data_source_column is not None and self.flat_data_source_column < len(row):
+            data_source = row[self.flat_data_source_column]
+        for feature, label, shape, columns in plan.features:
+            self.count_feature(feature, label, shape, [row[i] for i in columns], data_source)
+        for column in plan.unmapped:
+            self.update_unmapped_stats(self.flat_columns[column].attr_name, row[column])
+
+        message_list = list(plan.messages)
+        message_list.extend(self.data_source_messages(data_source))
+        self.add_messages(message_list, input_row_num)
+        if self.source_analyzers is not None:
+            counted_features = [(x[0], x[1], x[2], [row[i] for i in x[3]]) for x in plan.features]
+            unmapped = [(self.flat_columns[column].attr_name, row[column]) for column in plan.unmapped]
+            self.source_analyzer(data_source).count_record(counted_features, unmapped, message_list, input_row_num)
+        return message_list
+
+    def count_feature(self, feature, label, shape, values, data_source=None):
+        """update the stats of one feature of a record, values being in the order of the shape's attributes"""
+        feature_stats = self.feature_stats.get(feature)
+        if feature_stats:
+            feature_stats["count"] += 1
+        else:
+            order = self.feature_order[feature]
+            feature_stats = self.feature_stats[feature] = {"order": order, "count": 1, "values": {}, "attributes": {}}
+
+        for i, attribute in zip(shape.order, shape.attr_codes):
+            self.update_feature_stats(feature, attribute, values[i])
+        if shape.label_attribute:
+            self.update_feature_stats(feature, shape.label_attribute, label)
+
+        if shape.desc_positions:  # capture the full feature
+            feature_desc = " ".join([values[i] for i in shape.desc_positions])
+            self.count_value(feature_stats, feature_desc)
+            if self.overlap_sketches is not None and feature in self.overlap_features:
+                key = (data_source_key(data_source), feature)
+                if key not in self.overlap_sketches:
+                    self.overlap_sketches[key] = MinHashSketch()
+                self.overlap_sketches[key].add(value_hash(overlap_value(feature_desc)))
+
+    def analyze_features(self, features, unmapped, message_list, data_source, has_record_id, input_row_num):
+        """update the feature and unmapped stats of a record and check it is complete"""
+        features_mapped = []
+        attributes_mapped = []
+        counted_features = []
+        for (parent, feature, label), (attrs, values) in features.items():
+            shape = self.get_feature_shape(feature, attrs, bool(label))
+            self.count_feature(feature, label, shape, values, data_source)
+            counted_features.append((feature, label, shape, values))
+            attributes_mapped.extend(shape.populated_attr_list)
+            message_list.extend(shape.messages)
+            if shape.complete:
                 features_mapped.append(feature)
-
-        if "DATA_SOURCE" not in input_data:
-            message_list.append(["ERROR", "DATA_SOURCE required"])
-        elif input_data["DATA_SOURCE"].upper() not in self.data_source_lookup:
-            message_list.append(["ERROR", f"DATA_SOURCE not found: {input_data['DATA_SOURCE']}"])
-        if "RECORD_ID" not in input_data:
+        for attr_name, attr_value in unmapped:
+            self.update_unmapped_stats(attr_name, attr_value)
+
+        message_list.extend(self.data_source_messages(data_source))
+        message_list.extend(self.record_messages(features_mapped, attributes_mapped, has_record_id))
+        self.add_messages(message_list, input_row_num)
+        if self.source_analyzers is not None:
+            self.source_analyzer(data_source).count_record(counted_features, unmapped, message_list, input_row_num)
+        return message_list
+
+    def count_record(self, counted_features, unmapped, message_list, input_row_num):
+        """update just the counters of a record the combined analyzer has already resolved and checked"""
+        self.record_count += 1
+        for feature, label, shape, values in counted_features:
+            self.count_feature(feature, label, shape, values)
+        for attr_name, attr_value in unmapped:
+            self.update_unmapped_stats(attr_name, attr_value)
+        self.add_messages(message_list, input_row_num)
+
+    def add_messages(self, message_list, input_row_num):
+        """count the messages of a record, and the record if any of them are errors"""
+        has_error = False
+        for message in message_list:
+            self.update_message_stats(message[0], message[1], input_row_num)
+            has_error = has_error or message[0] == "ERROR"
+        if has_error:
+            self.error_record_count += 1
+            if quarantine_errors(message_list):
+                self.load_error_record_count += 1
+
+    def data_source_messages(self, data_source):
+        if data_source is None:
+            return [["ERROR", "DATA_SOURCE required"]]
+        elif data_source.upper() not in self.data_source_lookup:
+            return [["ERROR", f"DATA_SOURCE not found: {data_source}"]]
+        return []
+
+    def record_messages(self, features_mapped, attributes_mapped, has_record_id):
+        """messages about what a record as a whole has mapped"""
+        message_list = []
+        if not has_record_id:
             message_list.append(["WARNING", "RECORD_ID desired"])
         if "RECORD_TYPE" not in attributes_mapped:
             message_list.append(["INFO", "RECORD_TYPE missing"])
@@ -326,13 +990,53 @@ class SzJsonAnalyzer:
         #     else:
         #         messages.append(['INFO', 'Use of other_id feature'])
 
-        for message in message_list:
-            self.update_message_stats(message[0], message[1], input_row_num)
-
-        # print(json.dumps(self.feature_stats, indent=4))
-        # input('wait')
+        return message_list
+
+    def candidate_stats(self, feature):
+        """estimated candidate comparisons of a feature and its values shared by enough records to be generic
+
+        Every pair of records sharing a value is a comparison, so a value on c records costs c*(c-1)/2.
+        Once the values of a feature are sketched only the top values are counted, by the number of records they are
+        certain to be on, so both numbers are lower bounds and partial is True.
+        """
+        ftype = self.feature_lookup.get(feature)
+        if not ftype or ftype["USED_FOR_CAND"] != "Yes" or ftype["FTYPE_FREQ"] not in GENERIC_VALUE_THRESHOLDS:
+            return None
+        threshold = GENERIC_VALUE_THRESHOLDS[ftype["FTYPE_FREQ"]]
+        values = self.feature_stats[feature]["values"]
+        counts = values.counts() if type(values) is ValueSketch else values
+        comparisons = sum(count * (count - 1) // 2 for count in counts.values())
+        generic_values = sorted([x for x in counts.items() if x[1] > threshold], key=lambda x: x[1], reverse=True)
+        partial = type(values) is ValueSketch and values.evicted
+        return threshold, comparisons, generic_values, partial
+
+    def overlap_rows(self, row_length):
+        """a row per candidate feature and data source with the estimated values each other data source shares"""
+        sketches = {}
+        for (data_source, feature), sketch in self.overlap_sketches.items():
+            sketches.setdefault(feature, {})[data_source] = sketch
+
+        table_rows = []
+        for feature in sorted(sketches.keys(), key=lambda k: self.feature_order[k]):
+            if len(sketches[feature]) < 2:
+                continue
+            for data_source, sketch in sorted(sketches[feature].items()):
+                row = ["" for x in range(row_length)]
+                row[0] = "OVERLAP"
+                row[1] = f"{feature} {data_source}"
+                row[4] = sketch.count()
+                overlaps = [(x, sketch.overlap(y)) for x, y in sketches[feature].items() if x != data_source]
+                overlaps.sort(key=lambda x: (-x[1], x[0]))
+                for i, (other_source, shared) in enumerate(overlaps[: row_length - 6], 6):
+                    row[i] = f"{other_source} {shared:,} ({round(min(shared / row[4], 1) * 100.00, 1)}%)"
+                table_rows.append(row)
+        return table_rows
 
     def get_report(self):
+        """build the report table, leaving the stats as they are so it can be called while still analyzing"""
+        # report level warnings and reclassed messages only go in this copy
+        message_stats = {category: dict(messages) for category, messages in self.message_stats.items()}
+
         table_headers = [
             "Category",
             "Attribute",
@@ -358,7 +1062,7 @@ class SzJsonAnalyzer:
             row[1] = feature
             row[2] = self.feature_stats[feature]["count"]
             row[3] = round(self.feature_stats[feature]["count"] / self.record_count * 100.00, 2)
-            row[4] = len(self.feature_stats[feature]["values"])
+            row[4] = self.unique_count(self.feature_stats[feature])
             row[5] = round(row[4] / row[2] * 100.00, 1)
 
             # warn of low population or uniqueness
@@ -368,29 +1072,41 @@ class SzJsonAnalyzer:
             self.low_fme_unique_percent = 50
             if self.feature_lookup.get(feature):
                 if row[3] <= self.low_population_percent:
-                    self.update_message_stats("WARNING", f"{feature} < {self.low_population_percent}% populated")
+                    message_stats["WARNING"][f"{feature} < {self.low_population_percent}% populated"] = REPORT_WARNING
                 if self.feature_lookup[feature]["FTYPE_FREQ"] in ("A1", "F1") and row[5] <= self.low_f1_unique_percent:
-                    self.update_message_stats("WARNING", f"{feature} < {self.low_f1_unique_percent}% unique")
+                    message_stats["WARNING"][f"{feature} < {self.low_f1_unique_percent}% unique"] = REPORT_WARNING
                 elif self.feature_lookup[feature]["FTYPE_FREQ"] == "FF" and row[5] <= self.low_ff_unique_percent:
-                    self.update_message_stats("WARNING", f"{feature} < {self.low_f1_unique_percent}% unique")
+                    message_stats["WARNING"][f"{feature} < {self.low_f1_unique_percent}% unique"] = REPORT_WARNING
                 elif (
                     self.feature_lookup[feature]["FTYPE_FREQ"] == "FM"
                     and self.feature_lookup[feature]["FTYPE_FREQ"] == "Yes"
                     and row[5] <= self.low_fme_unique_percent
                 ):
-                    self.update_message_stats("WARNING", f"{feature} < {self.low_f1_unique_percent}% unique")
+                    message_stats["WARNING"][f"{feature} < {self.low_f1_unique_percent}% unique"] = REPORT_WARNING
+
+            # warn of values so common they will be generic, listing the worst
+            candidate_stats = self.candidate_stats(feature)
+            if candidate_stats and candidate_stats[2]:
+                threshold, comparisons, generic_values, partial = candidate_stats
+                if partial:
+                    message = (
+                        f"{feature} has at least {len(generic_values)} values on over {threshold} records, "
+                        f"at least {comparisons:,} candidate comparisons (estimated within --max_memory)"
+                    )
+                else:
+                    message = (
+                        f"{feature} has {len(generic_values)} values on over {threshold} records, "
+                        f"about {comparisons:,} candidate comparisons"
+                    )
+                worst_values = []
+                for value, count in generic_values[: len(row) - 6]:
+                    display_value = value[0:97] + "..." if len(value) > 100 else value
+                    worst_values.append(f"{display_value} ({count})")
+                message_stats["WARNING"][message] = {"count": sum(x[1] for x in generic_values), "rows": worst_values}
 
-            i = 5
-            for value in sorted(
-                self.feature_stats[feature]["values"],
-                key=lambda x: self.feature_stats[feature]["values"][x],
-                reverse=True,
-            ):
+            for i, (value, count) in enumerate(self.top_values(self.feature_stats[feature], len(row) - 6), 6):
                 display_value = value[0:97] + "..." if len(value) > 100 else value
-                i += 1
-                row[i] = f"{display_value} ({self.feature_stats[feature]['values'][value]})"
-                if i == len(row) - 1:
-                    break
+                row[i] = f"{display_value} ({count})"
             table_rows.append(row)
             if (
                 len(self.feature_stats[feature]["attributes"]) > 1
@@ -407,21 +1123,12 @@ class SzJsonAnalyzer:
                     row[3] = round(
                         self.feature_stats[feature]["attributes"][attribute]["count"] / self.record_count * 100.00, 1
                     )
-                    row[4] = len(self.feature_stats[feature]["attributes"][attribute]["values"])
+                    attr_stats = self.feature_stats[feature]["attributes"][attribute]
+                    row[4] = self.unique_count(attr_stats)
                     row[5] = round(row[4] / row[2] * 100.00, 1)
-                    i = 5
-                    for value in sorted(
-                        self.feature_stats[feature]["attributes"][attribute]["values"],
-                        key=lambda x: self.feature_stats[feature]["attributes"][attribute]["values"][x],
-                        reverse=True,
-                    ):
+                    for i, (value, count) in enumerate(self.top_values(attr_stats, len(row) - 6), 6):
                         display_value = value[0:97] + "..." if len(value) > 100 else value
-                        i += 1
-                        row[i] = (
-                            f"{display_value} ({self.feature_stats[feature]['attributes'][attribute]['values'][value]})"
-                        )
-                        if i == len(row) - 1:
-                            break
+                        row[i] = f"{display_value} ({count})"
                     table_rows.append(row)
 
         table_rows.append(["" for x in range(len(table_headers))])
@@ -431,38 +1138,30 @@ class SzJsonAnalyzer:
             row[1] = attribute
             row[2] = self.unmapped_stats[attribute]["count"]
             row[3] = round(self.unmapped_stats[attribute]["count"] / self.record_count * 100.00, 1)
-            row[4] = len(self.unmapped_stats[attribute]["values"])
+            row[4] = self.unique_count(self.unmapped_stats[attribute])
             row[5] = round(row[4] / row[2] * 100.00, 1)
-            i = 5
-            for value in sorted(
-                self.unmapped_stats[attribute]["values"],
-                key=lambda x: self.unmapped_stats[attribute]["values"][x],
-                reverse=True,
-            ):
+            for i, (value, count) in enumerate(self.top_values(self.unmapped_stats[attribute], len(row) - 6), 6):
                 display_value = value[0:97] + "..." if len(value) > 100 else value
-                i += 1
-                row[i] = f"{display_value} ({self.unmapped_stats[attribute]['values'][value]})"
-                if i == len(row) - 1:
-                    break
+                row[i] = f"{display_value} ({count})"
             table_rows.append(row)
 
         # reclass info to warning if higher than threshold percent
         old_category = "INFO"
         new_category = "WARNING"
         reclass_message_list = []
-        for message in self.message_stats.get(old_category, {}).keys():
-            if self.message_stats[old_category][message]["count"] / self.record_count >= 0.25:
+        for message in message_stats.get(old_category, {}).keys():
+            if message_stats[old_category][message]["count"] / self.record_count >= 0.25:
                 reclass_message_list.append(message)
         for message in reclass_message_list:
-            self.message_stats[new_category][message] = self.message_stats[old_category][message]
-            del self.message_stats[old_category][message]
+            message_stats[new_category][message] = message_stats[old_category][message]
+            del message_stats[old_category][message]
 
         for category in ["ERROR", "WARNING", "INFO"]:
-            if category in self.message_stats:
-                if not self.message_stats[category]:
+            if category in message_stats:
+                if not message_stats[category]:
                     continue
                 table_rows.append(["" for x in range(len(table_headers))])
-                for message in sorted(self.message_stats[category].keys()):
+                for message in sorted(message_stats[category].keys()):
                     row = ["" for x in range(len(table_headers))]
                     row[0] = category
                     row[1] = message
@@ -472,24 +1171,230 @@ class SzJsonAnalyzer:
                         row[4] = ""
                         row[5] = ""
                     else:
-                        row[2] = self.message_stats[category][message]["count"]
-                        row[3] = round(self.message_stats[category][message]["count"] / self.record_count * 100.00, 1)
+                        row[2] = message_stats[category][message]["count"]
+                        row[3] = round(message_stats[category][message]["count"] / self.record_count * 100.00, 1)
                         row[4] = ""
                         row[5] = ""
                         i = 5
-                        for value in self.message_stats[category][message]["rows"]:
+                        for value in message_stats[category][message]["rows"]:
                             i += 1
-                            row[i] = value
-                            self.message_stats[category][message]["rows"]
+                            row[i] = f"row {value}" if isinstance(value, int) else value
                             if i == len(row) - 1:
                                 break
 
                     table_rows.append(row)
 
+        # the values of each candidate feature the data sources have in common
+        if self.overlap_sketches:
+            table_rows.append(["" for x in range(len(table_headers))])
+            table_rows.extend(self.overlap_rows(len(table_headers)))
+
+        # then the same report for each data source's own records
+        for data_source in sorted(self.source_analyzers or {}):
+            source_analyzer = self.source_analyzers[data_source]
+            row = ["" for x in range(len(table_headers))]
+            row[0] = "DATA_SOURCE"
+            row[1] = data_source
+            row[2] = source_analyzer.record_count
+            row[3] = round(source_analyzer.record_count / self.record_count * 100.00, 1)
+            table_rows.append(["" for x in range(len(table_headers))])
+            table_rows.append(row)
+            table_rows.extend(source_analyzer.get_report()[1:])
+
         return table_rows
 
 
 # =========================
+def flagged_messages(message_list):
+    """the distinct errors and warnings of a record, the ones worth going back to"""
+    return list(dict.fromkeys((x[0], x[1]) for x in message_list if x[0] in ("ERROR", "WARNING")))
+
+
+def read_record_at(file_info, offset, file_handles):
+    """seek to a record's byte offset and return the record as a dictionary"""
+    file_name = file_info["name"]
+    if file_name not in file_handles:
+        file_handles[file_name] = open(file_name, "rb")
+    file = file_handles[file_name]
+    file.seek(offset)
+    if file_info["type"] == "csv":
+        row = next(csv.reader(OffsetLineReader(file, "utf-8-sig"), delimiter=file_info["delimiter"]), [])
+        return dict(zip(file_info["header"], row))
+    return json.loads(file.readline().decode("utf-8"))
+
+
+class FlaggedRecords:
+    """byte offsets of the records behind each error and warning, optionally copying the records to side-car files
+
+    Side-car files are named <prefix>.error.jsonl and <prefix>.warning.jsonl. With a sample size only the
+    first records of each message are copied.
+    """
+
+    max_pointers = 1000  # per message in the index
+
+    def __init__(self, files, sidecar_prefix=None, sidecar_sample=0):
+        self.files = files  # name, type and csv layout of each input file, as pointed to by file index
+        self.entries = {}
+        self.sidecar_prefix = sidecar_prefix
+        self.sidecar_sample = sidecar_sample
+        self.sidecar_files = {}
+        self.file_handles = {}
+
+    def add(self, flagged, row_num, file_index, offset, record=None):
+        """remember where a record with these flagged messages is, record being read back when not given"""
+        sidecar_messages = {}
+        for category, message in flagged:
+            entry = self.entries.get((category, message))
+            if not entry:
+                entry = self.entries[(category, message)] = {"count": 0, "pointers": []}
+            entry["count"] += 1
+            if len(entry["pointers"]) < self.max_pointers:
+                entry["pointers"].append([file_index, offset, row_num])
+            if self.sidecar_prefix and (not self.sidecar_sample or entry["count"] <= self.sidecar_sample):
+                sidecar_messages.setdefault(category, []).append(message)
+
+        for category, messages in sidecar_messages.items():
+            if record is None:
+                record = read_record_at(self.files[file_index], offset, self.file_handles)
+            elif isinstance(record, list):
+                record = dict(zip(self.files[file_index]["header"], record))
+            if category not in self.sidecar_files:
+                file_name = f"{self.sidecar_prefix}.{category.lower()}.jsonl"
+                self.sidecar_files[category] = open(file_name, "w", encoding="utf-8")
+            sidecar_data = {
+                "row": row_num,
+                "file": self.files[file_index]["name"],
+                "offset": offset,
+                "messages": messages,
+                "record": record,
+            }
+            self.sidecar_files[category].write(json.dumps(sidecar_data) + "\n")
+
+    def save(self, index_file_name):
+        index = {"files": self.files, "entries": []}
+        for (category, message), entry in self.entries.items():
+            index["entries"].append({"category": category, "message": message, **entry})
+        with open(index_file_name, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+
+    def close(self):
+        for file in list(self.sidecar_files.values()) + list(self.file_handles.values()):
+            file.close()
+
+
+def lookup_records(index_file_name, lookup_spec):
+    """print the records an offset index points to for a message or 'row N', or list the indexed messages"""
+    with open(index_file_name, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if not lookup_spec:
+        for entry in index["entries"]:
+            indexed = len(entry["pointers"])
+            print(f"{entry['category']}: {entry['message']} ({entry['count']}), {indexed} records indexed")
+        return 0
+
+    pointers = {}
+    if lookup_spec.lower().startswith("row ") and lookup_spec[4:].strip().isdigit():
+        row_num = int(lookup_spec[4:])
+        for entry in index["entries"]:
+            pointers.update({x[2]: x for x in entry["pointers"] if x[2] == row_num})
+    else:
+        for entry in index["entries"]:
+            if entry["message"] == lookup_spec:
+                pointers.update({x[2]: x for x in entry["pointers"]})
+    if not pointers:
+        print(f"\nNo records indexed for {lookup_spec}\n")
+        return 1
+
+    file_handles = {}
+    try:
+        for file_index, offset, row_num in sorted(pointers.values(), key=lambda x: x[2]):
+            file_info = index["files"][file_index]
+            print(f"\n-- row {row_num}, {file_info['name']} @ byte {offset}")
+            print(json.dumps(read_record_at(file_info, offset, file_handles), indent=4))
+    finally:
+        for file in file_handles.values():
+            file.close()
+    print()
+    return 0
+
+
+def quarantine_errors(message_list):
+    """whether a record has errors that keep it out of the load shards and count toward --fail_fast
+
+    DATA_SOURCE not found only says the data source is not in the config analyzed against (the cached
+    default config has none of a project's own), so it is added to the config rather than quarantined.
+    """
+    return any(x[0] == "ERROR" and not x[1].startswith("DATA_SOURCE not found") for x in message_list)
+
+
+def shard_index(record_key, record, shard_count, has_error):
+    """the shard a record is loaded from, stable across runs, or shard_count (the quarantine) if it has errors"""
+    if has_error:
+        return shard_count
+    hashed = record_key_hash(*record_key)[0]
+    if not hashed:  # no RECORD_ID so go by the whole record, which at least keeps a reload in the same shard
+        hashed = value_hash(json.dumps(record, sort_keys=True))
+    return hashed % shard_count
+
+
+class ShardWriter:
+    """writes records to load-ready jsonl shards by a hash of their DATA_SOURCE and RECORD_ID
+
+    Shards are named <prefix>.<n>.jsonl, records with errors going to <prefix>.quarantine.jsonl instead.
+    Each file gets a <file>.manifest.json with its record counts by data source, size and sha256.
+    The prefix's directory is created if it does not exist yet.
+    """
+
+    def __init__(self, prefix, shard_count):
+        self.shard_count = shard_count
+        os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+        width = len(str(shard_count - 1))
+        file_names = [f"{prefix}.{i:0{width}d}.jsonl" for i in range(shard_count)] + [f"{prefix}.quarantine.jsonl"]
+        self.shards = []
+        for file_name in file_names:
+            shard = {"file": file_name, "records": 0, "bytes": 0, "data_sources": {}}
+            shard["sha256"] = hashlib.sha256()
+            shard["handle"] = open(file_name, "wb")
+            self.shards.append(shard)
+
+    def add(self, index, data, data_source):
+        """write a record's line (bytes ending in a newline) to a shard"""
+        shard = self.shards[index]
+        shard["handle"].write(data)
+        shard["sha256"].update(data)
+        shard["records"] += 1
+        shard["bytes"] += len(data)
+        data_source = data_source_key(data_source)
+        shard["data_sources"][data_source] = shard["data_sources"].get(data_source, 0) + 1
+
+    def add_part(self, index, data, data_source_counts):
+        """write the lines a worker gathered for a shard"""
+        shard = self.shards[index]
+        shard["handle"].write(data)
+        shard["sha256"].update(data)
+        shard["bytes"] += len(data)
+        for data_source, count in data_source_counts.items():
+            shard["records"] += count
+            shard["data_sources"][data_source] = shard["data_sources"].get(data_source, 0) + count
+
+    def close(self, complete=True):
+        """close the shards and write their manifests, complete being false if the run was cut short"""
+        for index, shard in enumerate(self.shards):
+            shard["handle"].close()
+            manifest = {
+                "file": os.path.basename(shard["file"]),
+                "shard": index if index < self.shard_count else "quarantine",
+                "shard_count": self.shard_count,
+                "complete": complete,
+                "records": shard["records"],
+                "bytes": shard["bytes"],
+                "sha256": shard["sha256"].hexdigest(),
+                "data_sources": dict(sorted(shard["data_sources"].items())),
+            }
+            with open(f"{shard['file']}.manifest.json", "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=4)
+
+
 class JsonlReader:
     def __init__(self, file_handle):
         self.file_handle = file_handle
@@ -501,6 +1406,111 @@ class JsonlReader:
         return json.loads(next(self.file_handle))
 
 
+# ----------------------------------------
+# percent of records with errors is only checked once there are enough to go by
+FAIL_FAST_MIN_ROWS = 1000
+
+
+def over_error_limit(analyzer, error_percent):
+    if analyzer.record_count < FAIL_FAST_MIN_ROWS:
+        return False
+    return analyzer.load_error_record_count * 100.0 / analyzer.record_count > error_percent
+
+
+# ----------------------------------------
+def split_file(file_name, chunk_count):
+    """line aligned byte ranges of a file so every chunk starts on a whole record"""
+    file_size = os.path.getsize(file_name)
+    boundaries = [0]
+    with open(file_name, "rb") as f:
+        for i in range(1, chunk_count):
+            f.seek(max(file_size * i // chunk_count, boundaries[-1]))
+            f.readline()
+            boundaries.append(f.tell())
+    boundaries.append(file_size)
+    return [(file_name, start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+
+def ordered_results(pool, func, tasks, window):
+    """(task, result) of each task in order, like pool.imap but only window tasks ahead of the one handed out
+
+    pool.imap keeps submitting while results wait their turn, so a slow early chunk could leave every later
+    chunk's result in memory at once.
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append((task, pool.apply_async(func, (task,))))
+        if len(pending) >= window:
+            task, result = pending.popleft()
+            yield task, result.get()
+    while pending:
+        task, result = pending.popleft()
+        yield task, result.get()
+
+
+def init_worker(config_tables, memory_budget, flag_records, check_duplicates, by_data_source, overlap, shard_count):
+    # the main process handles ctrl-c and terminates the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    global worker_config_tables, worker_memory_budget, worker_flag_records, worker_check_duplicates
+    global worker_by_data_source, worker_overlap, worker_shard_count
+    worker_config_tables = config_tables
+    worker_memory_budget = memory_budget
+    worker_flag_records = flag_records
+    worker_check_duplicates = check_duplicates
+    worker_by_data_source = by_data_source
+    worker_overlap = overlap
+    worker_shard_count = shard_count
+
+
+def analyze_range(task):
+    """analyze the records between two byte offsets of a file, numbering rows from the start of the range"""
+    file_name, start, end = task
+    analyzer = SzJsonAnalyzer(worker_config_tables)
+    analyzer.memory_budget = worker_memory_budget
+    if worker_by_data_source:
+        analyzer.source_analyzers = {}
+    if worker_overlap:
+        analyzer.overlap_sketches = {}
+    position = start
+    row_count = 0
+    flagged_rows = []
+    key_rows = array("Q")  # key hash, data source number and offset of each row for the duplicate check
+    key_data_sources = {}
+    # lines and record counts by data source for each shard, plus the quarantine
+    shard_lines = [[] for x in range(worker_shard_count + 1)] if worker_shard_count else []
+    shard_counts = [{} for x in range(len(shard_lines))]
+    with open(file_name, "rb") as f:
+        f.seek(start)
+        for line in f:
+            if position >= end:
+                break
+            row_count += 1
+            input_data = json.loads(line)
+            message_list = analyzer.analyze_json(input_data, row_count)
+            if worker_flag_records and message_list:
+                flagged = flagged_messages(message_list)
+                if flagged:
+                    flagged_rows.append((row_count, position, flagged))
+            if worker_check_duplicates:
+                hashed, data_source = record_key_hash(*analyzer.record_key(input_data))
+                data_source_id = key_data_sources.setdefault(data_source, len(key_data_sources) + 1) if hashed else 0
+                key_rows.extend((hashed, data_source_id, position))
+            if worker_shard_count:
+                has_error = quarantine_errors(message_list)
+                index = shard_index(analyzer.record_key(input_data), input_data, worker_shard_count, has_error)
+                shard_lines[index].append(line if line.endswith(b"\n") else line + b"\n")
+                data_source = data_source_key(input_data.get("DATA_SOURCE"))
+                shard_counts[index][data_source] = shard_counts[index].get(data_source, 0) + 1
+            position += len(line)
+    state = analyzer.stats_state()
+    state["row_count"] = row_count
+    state["flagged_rows"] = flagged_rows
+    state["key_rows"] = key_rows
+    state["key_data_sources"] = list(key_data_sources)
+    state["shard_parts"] = [(b"".join(x), y) for x, y in zip(shard_lines, shard_counts)]
+    return state
+
+
 # ----------------------------------------
 def format_pretty_table(table_rows):
     table_object = prettytable.PrettyTable()
@@ -514,6 +1524,8 @@ def format_pretty_table(table_rows):
         "ERROR": "\033[38;5;124m",
         "WARNING": "\033[38;5;202m",
         "INFO": "\033[38;5;39m",
+        "DATA_SOURCE": "\033[01m",
+        "OVERLAP": "\033[38;5;141m",
         "HEADER": "\033[38;5;242m",
         "DIM": "\033[02m",
         "RESET": "\033[0m",
@@ -523,14 +1535,13 @@ def format_pretty_table(table_rows):
     missing_data_sources = []
     low_population_features = []
     low_unique_features = []
-    for message in analyzer.message_stats.get("ERROR", {}):
-        if message.startswith("DATA_SOURCE not found: "):
-            missing_data_sources.append(message.split()[-1])
-    for message in analyzer.message_stats.get("WARNING", {}):
-        if "populated" in message:
-            low_population_features.append(message.split()[0])
-        elif "unique" in message:
-            low_unique_features.append(message.split()[0])
+    for row in table_rows[1:]:
+        if row[0] == "ERROR" and row[1].startswith("DATA_SOURCE not found: "):
+            missing_data_sources.append(row[1].split()[-1])
+        elif row[0] == "WARNING" and "populated" in row[1]:
+            low_population_features.append(row[1].split()[0])
+        elif row[0] == "WARNING" and "unique" in row[1]:
+            low_unique_features.append(row[1].split()[0])
 
     table_object.field_names = [f"{colors['HEADER']}{x}{colors['RESET']}" for x in table_rows[0]]
     for orig_row in table_rows[1:]:
@@ -613,6 +1624,12 @@ def format_csv_table(table_rows):
     return output.getvalue()
 
 
+# ----------------------------------------
+def save_csv_report(analyzer, output_file, report_table=None):
+    with open(output_file, "w", encoding="utf-8") as outfile:
+        outfile.write(format_csv_table(report_table or analyzer.get_report()))
+
+
 # ----------------------------------------
 def print_report(report_string):
     less = subprocess.Popen(["less", "-FMXSR"], stdin=subprocess.PIPE)
@@ -639,55 +1656,320 @@ if __name__ == "__main__":
     signal.signal(signal.SIGINT, signal_handler)
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("input_file", help="the name of the input file to analyze")
+    parser.add_argument("input_file", help="the name of the input file to analyze, or a quoted glob of shards")
     parser.add_argument("-o", "--output_file", dest="output_file", help="optional name of the output file")
+    parser.add_argument(
+        "-w", "--workers", dest="workers", type=int, default=1, help="number of processes to analyze jsonl input with"
+    )
+    parser.add_argument(
+        "--max_memory",
+        "--max-memory",
+        dest="max_memory",
+        help="memory for exact attribute values such as 512M or 4G, beyond which the largest are estimated",
+    )
+    parser.add_argument(
+        "--refresh_config",
+        "--refresh-config",
+        dest="refresh_config",
+        action="store_true",
+        help="reload the configuration from Senzing even if its config ID matches the cached copy",
+    )
+    parser.add_argument(
+        "--report_every",
+        "--report-every",
+        dest="report_every",
+        type=int,
+        default=0,
+        help="rewrite the output file with a partial report every this many rows",
+    )
+    parser.add_argument(
+        "--report_interval",
+        "--report-interval",
+        dest="report_interval",
+        type=float,
+        default=0,
+        help="rewrite the output file with a partial report every this many seconds",
+    )
+    parser.add_argument(
+        "--fail_fast",
+        "--fail-fast",
+        dest="fail_fast",
+        type=float,
+        help=f"abort once more than this percent of records have errors other than DATA_SOURCE not found "
+        f"(checked after {FAIL_FAST_MIN_ROWS:,} rows)",
+    )
+    parser.add_argument(
+        "--offsets",
+        dest="offsets",
+        help="save the byte offsets of the records behind each error and warning to this index file",
+    )
+    parser.add_argument(
+        "--sidecar",
+        dest="sidecar",
+        help="copy records with errors or warnings to <prefix>.error.jsonl and <prefix>.warning.jsonl",
+    )
+    parser.add_argument(
+        "--sidecar_sample",
+        "--sidecar-sample",
+        dest="sidecar_sample",
+        type=int,
+        default=0,
+        help="only copy this many records per message to the side-car files",
+    )
+    parser.add_argument(
+        "--lookup",
+        dest="lookup",
+        nargs="?",
+        const="",
+        help="print the records an --offsets index (the input file) has for a message or 'row N', or list its messages",
+    )
+    parser.add_argument(
+        "--duplicates",
+        dest="duplicates",
+        action="store_true",
+        help="check for RECORD_IDs used more than once in a DATA_SOURCE (key hashes are spilled to --temp_dir)",
+    )
+    parser.add_argument("--temp_dir", dest="temp_dir", help="directory for temporary files, defaults to the system's")
+    parser.add_argument(
+        "--by_data_source",
+        "--by-data-source",
+        dest="by_data_source",
+        action="store_true",
+        help="follow the combined report with a section for each DATA_SOURCE, all from the same pass",
+    )
+    parser.add_argument(
+        "--overlap",
+        dest="overlap",
+        action="store_true",
+        help="estimate how many values of each candidate feature (e.g. PHONE) the data sources have in common",
+    )
+    parser.add_argument(
+        "--shards",
+        dest="shards",
+        help="write the records to load-ready shards named <prefix>.<n>.jsonl, those with errors to a quarantine",
+    )
+    parser.add_argument(
+        "--shard_count",
+        "--shard-count",
+        dest="shard_count",
+        type=int,
+        default=8,
+        help="number of --shards to split the records between by DATA_SOURCE and RECORD_ID, default 8",
+    )
     args = parser.parse_args()
 
-    if not os.path.exists(args.input_file):
+    if args.lookup is not None:
+        sys.exit(lookup_records(args.input_file, args.lookup))
+
+    file_list = [args.input_file] if os.path.exists(args.input_file) else sorted(glob.glob(args.input_file))
+    if not file_list:
         parser.error(f"Input file not found: {args.input_file}")
+    if args.workers > 1 and any(os.path.splitext(x)[1].upper() == ".CSV" for x in file_list):
+        parser.error("--workers is only supported for jsonl input")
+    if args.shards and args.shard_count < 1:
+        parser.error("--shard_count must be at least 1")
+    if (args.report_every or args.report_interval) and not args.output_file:
+        parser.error("--report_every and --report_interval need an output file (-o) to write to")
 
     config_file_name = f"{os.path.dirname(os.path.abspath(sys.argv[0]))}{os.path.sep}sz_default_config.json"
-    config_data, config_message = get_config_data(config_file_name)
+    config_tables, config_message = get_config_tables(config_file_name, args.refresh_config)
     print(f"\n{config_message}\n")
-    if not config_data:
+    if not config_tables:
         sys.exit(1)
-    analyzer = SzJsonAnalyzer(config_data)
-
-    input_file_handle = open(args.input_file, "r")
-    input_file_ext = os.path.splitext(args.input_file)[1].upper()
-    if input_file_ext == ".CSV":
-        sniffer = csv.Sniffer().sniff(input_file_handle.readline(), delimiters="|,\t")
-        input_file_handle.seek(0)
-        delimiter = sniffer.delimiter
-        if sniffer.delimiter == "\t":
-            dialect = "excel-tab"
-        elif sniffer.delimiter == "|":
-            csv.register_dialect("pipe", delimiter="|", quotechar='"')
-            dialect = "pipe"
-        else:
-            dialect = "excel"
-        reader = csv.DictReader(input_file_handle, dialect=csv_dialect)
-    else:
-        reader = JsonlReader(input_file_handle)
+    analyzer = SzJsonAnalyzer(config_tables)
+    if args.by_data_source:
+        analyzer.source_analyzers = {}
+    if args.overlap:
+        analyzer.overlap_sketches = {}
+    worker_memory_budget = None
+    if args.max_memory:
+        try:
+            memory_budget = parse_size(args.max_memory)
+        except ValueError:
+            parser.error(f"Invalid --max_memory size {args.max_memory}, try 512M or 4G")
+        # with workers, half is for the merged stats and the rest split between the workers
+        analyzer.memory_budget = memory_budget // 2 if args.workers > 1 else memory_budget
+        worker_memory_budget = memory_budget // (2 * args.workers)
+    refresher = None
+    if args.report_every or args.report_interval:
+        refresher = ReportRefresher(
+            analyzer, args.output_file, save_csv_report, args.report_every, args.report_interval
+        )
+    failed = False
+    file_infos = []
+    flagged_records = None
+    if args.offsets or args.sidecar:
+        flagged_records = FlaggedRecords(file_infos, args.sidecar, args.sidecar_sample)
+    duplicate_check = None
+    if args.duplicates:
+        duplicate_check = DuplicateKeyCheck(args.temp_dir)
+        atexit.register(duplicate_check.close)
+    shard_writer = None
+    if args.shards:
+        try:
+            shard_writer = ShardWriter(args.shards, args.shard_count)
+        except OSError as err:
+            parser.error(f"cannot write --shards {args.shards}: {err}")
 
     proc_start_time = time.time()
     input_row_count = 0
-    for input_row in reader:
-        input_row_count += 1
-        analyzer.analyze_json(input_row, input_row_count)
-        if input_row_count % 10000 == 0:
-            eps = int(
-                float(input_row_count)
-                / (float(time.time() - proc_start_time if time.time() - proc_start_time != 0 else 0))
-            )
-            print(f"{input_row_count:,} rows processed at {eps:,} per second")
-        if shut_down:
-            break
+    if args.workers > 1:
+        # several chunks per worker so one slow range does not hold up the rest
+        total_size = sum(os.path.getsize(x) for x in file_list)
+        chunk_size = max(total_size // (args.workers * 4), 1024 * 1024)
+        if shard_writer or duplicate_check:
+            # each chunk's records or record keys come back through memory to be handled in order
+            chunk_size = min(chunk_size, 64 * 1024 * 1024)
+        tasks = []
+        file_indexes = {}
+        for file_name in file_list:
+            tasks.extend(split_file(file_name, -(-os.path.getsize(file_name) // chunk_size)))
+            file_indexes[file_name] = len(file_infos)
+            file_infos.append({"name": file_name, "type": "jsonl"})
+
+        # results come back in input order so row numbers continue from the prior chunk
+        worker_args = (
+            config_tables,
+            worker_memory_budget,
+            flagged_records is not None,
+            duplicate_check is not None,
+            args.by_data_source,
+            args.overlap,
+            args.shard_count if shard_writer else 0,
+        )
+        with multiprocessing.Pool(args.workers, initializer=init_worker, initargs=worker_args) as pool:
+            # two chunks per worker in flight keeps the workers busy while bounding the results held
+            for task, state in ordered_results(pool, analyze_range, tasks, args.workers * 2):
+                analyzer.merge_stats(state, input_row_count)
+                file_index = file_indexes[task[0]]
+                for row_num, offset, flagged in state["flagged_rows"]:
+                    flagged_records.add(flagged, row_num + input_row_count, file_index, offset)
+                if duplicate_check:
+                    # the bloom filter has to see every row in order so it runs here rather than in the workers
+                    data_source_ids = [0] + [duplicate_check.data_source_id(x) for x in state["key_data_sources"]]
+                    key_rows = state["key_rows"]
+                    for i in range(0, len(key_rows), 3):
+                        data_source_id = data_source_ids[key_rows[i + 1]]
+                        duplicate_check.add_hash(key_rows[i], data_source_id, file_index, key_rows[i + 2])
+                for index, (data, data_source_counts) in enumerate(state["shard_parts"]):
+                    if data:
+                        shard_writer.add_part(index, data, data_source_counts)
+                input_row_count += state["row_count"]
+                eps = int(float(input_row_count) / max(time.time() - proc_start_time, 0.001))
+                print(f"{input_row_count:,} rows processed at {eps:,} per second")
+                if refresher:
+                    refresher.check()
+                if args.fail_fast is not None and over_error_limit(analyzer, args.fail_fast):
+                    failed = shut_down = True
+                if shut_down:
+                    pool.terminate()
+                    break
+    else:
+        for file_name in file_list:
+            input_file_ext = os.path.splitext(file_name)[1].upper()
+            # lines are read in binary so the byte offset of each record is known
+            input_file_handle = open(file_name, "rb")
+            if input_file_ext == ".CSV":
+                sniffer = csv.Sniffer().sniff(input_file_handle.readline().decode("utf-8-sig"), delimiters="|,\t")
+                input_file_handle.seek(0)
+                if sniffer.delimiter == "\t":
+                    dialect = "excel-tab"
+                elif sniffer.delimiter == "|":
+                    csv.register_dialect("pipe", delimiter="|", quotechar='"')
+                    dialect = "pipe"
+                else:
+                    dialect = "excel"
+                line_reader = OffsetLineReader(input_file_handle, "utf-8-sig")
+                reader = csv.reader(line_reader, dialect=dialect)
+                header = next(reader, [])
+                analyzer.resolve_header(header)
+                analyze_row = analyzer.analyze_flat
+                file_info = {"name": file_name, "type": "csv", "delimiter": sniffer.delimiter, "header": header}
+            else:
+                line_reader = OffsetLineReader(input_file_handle, "utf-8")
+                reader = JsonlReader(line_reader)
+                analyze_row = analyzer.analyze_json
+                file_info = {"name": file_name, "type": "jsonl"}
+            file_index = len(file_infos)
+            file_infos.append(file_info)
+
+            record_offset = line_reader.offset
+            for input_row in reader:
+                input_row_count += 1
+                message_list = analyze_row(input_row, input_row_count)
+                if flagged_records and message_list:
+                    flagged = flagged_messages(message_list)
+                    if flagged:
+                        flagged_records.add(flagged, input_row_count, file_index, record_offset, input_row)
+                if duplicate_check:
+                    duplicate_check.add(*analyzer.record_key(input_row), file_index, record_offset)
+                if shard_writer:
+                    has_error = quarantine_errors(message_list)
+                    if file_info["type"] == "csv":
+                        record = {k: v for k, v in zip(header, input_row) if v}
+                        data = (json.dumps(record) + "\n").encode("utf-8")
+                    else:
+                        record = input_row
+                        data = line_reader.line if line_reader.line.endswith(b"\n") else line_reader.line + b"\n"
+                    index = shard_index(analyzer.record_key(input_row), record, args.shard_count, has_error)
+                    shard_writer.add(index, data, record.get("DATA_SOURCE"))
+                record_offset = line_reader.offset
+                if input_row_count % 10000 == 0:
+                    eps = int(
+                        float(input_row_count)
+                        / (float(time.time() - proc_start_time if time.time() - proc_start_time != 0 else 0))
+                    )
+                    print(f"{input_row_count:,} rows processed at {eps:,} per second")
+                if refresher:
+                    refresher.check()
+                if args.fail_fast is not None and over_error_limit(analyzer, args.fail_fast):
+                    failed = shut_down = True
+                if shut_down:
+                    break
+            input_file_handle.close()
+            if shut_down:
+                break
 
     elapsed_mins = round((time.time() - proc_start_time) / 60, 1)
     run_status = ("completed in" if not shut_down else "aborted after") + " %s minutes" % elapsed_mins
     print(f"{input_row_count:,} rows processed, {run_status}\n")
-    input_file_handle.close()
+    if failed:
+        error_percent = round(analyzer.load_error_record_count * 100.0 / analyzer.record_count, 1)
+        print(f"{error_percent}% of records have errors, over the --fail_fast limit of {args.fail_fast}%\n")
+    if shard_writer:
+        shard_writer.close(not shut_down)
+        quarantined = shard_writer.shards[-1]["records"]
+        print(f"Records written to {args.shards}.*.jsonl ({args.shard_count} shards), {quarantined:,} quarantined")
+        print("Each file has a .manifest.json with its record counts and sha256\n")
+        if quarantined > input_row_count / 2:
+            print(f"WARNING: {quarantined:,} of {input_row_count:,} records were quarantined, see the report errors\n")
+    if flagged_records:
+        flagged_records.close()
+        if args.offsets:
+            flagged_records.save(args.offsets)
+            print(f"Offsets of flagged records saved to {args.offsets}, see them with: --lookup \"message\"\n")
+        if args.sidecar:
+            print(f"Flagged records copied to {args.sidecar}.error.jsonl and {args.sidecar}.warning.jsonl\n")
+    if duplicate_check:
+        print("checking for duplicate RECORD_IDs ...\n")
+        file_handles = {}
+        for data_source, stats in duplicate_check.find_duplicates().items():
+            samples = []
+            for first_row, duplicate_row, pointer in stats["samples"]:
+                record = read_record_at(file_infos[pointer >> 40], pointer & ((1 << 40) - 1), file_handles)
+                samples.append(f"{record.get('RECORD_ID')} (rows {first_row}, {duplicate_row})")
+            message = f"RECORD_ID duplicated in {data_source} ({stats['record_ids']:,} ids)"
+            analyzer.message_stats["ERROR"][message] = {"count": stats["records"], "rows": samples}
+            if analyzer.source_analyzers is not None:
+                analyzer.source_analyzer(data_source).message_stats["ERROR"][message] = dict(
+                    analyzer.message_stats["ERROR"][message]
+                )
+        for file in file_handles.values():
+            file.close()
+        duplicate_check.close()
+    sketch_count = sum(type(x["values"]) is ValueSketch for x in analyzer.value_tables())
+    if sketch_count:
+        print(f"Unique counts and top values of {sketch_count} attributes are estimated to stay within --max_memory\n")
 
     print("\ncreating report ...\n")
     report_table = analyzer.get_report()
@@ -697,7 +1979,6 @@ if __name__ == "__main__":
 
     # --write statistics file
     if args.output_file:
-        with open(args.output_file, "w", encoding="utf-8") as outfile:
-            outfile.write(format_csv_table(report_table))
+        save_csv_report(analyzer, args.output_file, report_table)
         print(f"Report written to {args.output_file}\n")
-    sys.exit(0)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,29 @@
+"""Import time budget of the CLI tools as a test
+
+    python3 -m unittest discover tools
+"""
+import unittest
+
+from check_import_budget import DEFAULT_BUDGET_MS, HEAVY_MODULES, check_runs
+
+
+class ImportBudgetTest(unittest.TestCase):
+    """Runs check_import_budget.py's runs once and checks each of them"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.results = check_runs()
+
+    def test_no_heavy_modules(self):
+        for run_name, total_ms, modules, problem in self.results:
+            with self.subTest(run=run_name):
+                self.assertEqual([x for x in HEAVY_MODULES if x in modules], [])
+
+    def test_within_budget(self):
+        for run_name, total_ms, modules, problem in self.results:
+            with self.subTest(run=run_name):
+                self.assertLessEqual(total_ms, DEFAULT_BUDGET_MS)
+
+
+if __name__ == "__main__":
+    unittest.main()